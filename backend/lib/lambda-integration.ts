@@ -14,6 +14,7 @@ interface LambdaIntegrationProps {
   actions?: string[][];
   conditions?: { [key: string]: any }[];  
   apiResource?: cdk.aws_apigateway.Resource;
+  additionalApiResources?: cdk.aws_apigateway.Resource[]; // Other resources served by the same Lambda and method (e.g. batch requests)
   method?: string;
   authorizer?: cdk.aws_apigateway.CfnAuthorizer;
   environment?: { [key: string]: string };
@@ -98,7 +99,7 @@ export class LambdaIntegration extends Construct {
       const lambdaIntegration = new apigateway.LambdaIntegration(this.lambdaFunction, {
         timeout: cdk.Duration.seconds(29), 
       });
-      var endpoint = props.apiResource.addMethod(props.method, lambdaIntegration, {
+      const methodOptions: apigateway.MethodOptions = {
         authorizationType: apigateway.AuthorizationType.COGNITO,
         authorizer: {
           authorizerId: props.authorizer.logicalId,
@@ -186,12 +187,16 @@ export class LambdaIntegration extends Construct {
             },
           },
         ],
-      });
+      };
+
+      for (const apiResource of [props.apiResource, ...(props.additionalApiResources ?? [])]) {
+        var endpoint = apiResource.addMethod(props.method, lambdaIntegration, methodOptions);
 
-      // Integrate with Cognito Authorization
-      const resourceEndpoint = endpoint.node.findChild('Resource');
-      (resourceEndpoint as apigateway.CfnResource).addPropertyOverride('AuthorizationType', apigateway.AuthorizationType.COGNITO);
-      (resourceEndpoint as apigateway.CfnResource).addPropertyOverride('AuthorizerId', { Ref: props.authorizer.logicalId });
+        // Integrate with Cognito Authorization
+        const resourceEndpoint = endpoint.node.findChild('Resource');
+        (resourceEndpoint as apigateway.CfnResource).addPropertyOverride('AuthorizationType', apigateway.AuthorizationType.COGNITO);
+        (resourceEndpoint as apigateway.CfnResource).addPropertyOverride('AuthorizerId', { Ref: props.authorizer.logicalId });
+      }
     }
   }
 }
@@ -5,17 +5,21 @@ This Lambda function processes a transcript and a question, utilizes an AI model
 
 Imports:
 --------
-- json: Used for handling JSON data.
-- boto3: AWS SDK for Python to interact with AWS services.
+- orjson: Used for parsing JSON data.
 - os: Provides access to environment variables.
 - logging: Provides log levels and structured logging.
+- concurrent.futures.ThreadPoolExecutor: Used to run independent AWS calls concurrently.
+- hashlib: Used to build the keys of the in-memory answer cache.
+- cachetools.TTLCache: Used to keep the answers in memory for a few minutes.
 - constants: Defines constants used throughout the module (imported from Lambda layer).
 - parameter_utils: Custom utility functions for extracting parameters from the event (imported from Lambda layer).
 - response_utils: Custom utility functions for formatting and sending responses (imported from Lambda layer).
+- client_utils: Custom utility functions for creating AWS service clients (imported from Lambda layer).
 - bedrock_utils: Custom utility functions for interacting with Bedrock AI models (imported from Lambda layer).
 - cognito_utils: Custom utility functions for handling AWS Cognito operations (imported from Lambda layer).
 - s3_utils: Custom utility functions for interacting with S3 (imported from Lambda layer).
 - s3_cache_utils: Custom utility functions for caching and retrieving responses from Amazon S3. 
+- polly_utils: Custom utility functions for using Amazon Polly to synthesize speech (imported from Lambda layer).
 
 Environment Variables:
 ----------------------
@@ -36,17 +40,21 @@ Functions:
 2. handler(event: dict, context: object) -> dict:
    Main entry point for the Lambda function. Handles the event, retrieves the transcription, generates an answer using the AI model, and optionally synthesizes speech for the answer. Stores the answer and audio in S3 and returns their locations.
 """
-import json
-import boto3
+import orjson
 import os
 import logging
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 import constants # from layer
 import parameter_utils # from layer
 import response_utils # from layer
+import client_utils # from layer
 import bedrock_utils # from layer
 import cognito_utils # from layer
 import s3_utils # from layer
 import s3_cache_utils # from layer
+import polly_utils # from layer
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -56,7 +64,35 @@ IDENTITY_POOL_ID = os.environ[constants.IDENTITY_POOL_ID]
 USER_POOL_ID = os.environ[constants.USER_POOL_ID]
 BEDROCK_GUARDRAIL_IDENTIFIER = os.environ[constants.BEDROCK_GUARDRAIL_IDENTIFIER]
 BEDROCK_GUARDRAIL_VERSION = os.environ[constants.BEDROCK_GUARDRAIL_VERSION]
-brt = boto3.client(service_name='bedrock-runtime', region_name=REGION)\
+brt = client_utils.get_client('bedrock-runtime', REGION)
+executor = ThreadPoolExecutor(max_workers=4)
+
+# Answers generated by this container, keyed by a digest of the identity, transcription job name, question, language and model id.
+# The answer keys in S3 are timestamped, so repeated questions are only detected here. Each entry holds the answer,
+# its S3 key and the speech synthesis result, so a repeated question reuses the stored answer and audio
+# instead of writing a new answer file and synthesizing the audio again.
+# Entries are dropped after 5 minutes and at most 256 answers are kept.
+ANSWER_CACHE_MAX_SIZE = 256
+ANSWER_CACHE_TTL = 300 # seconds
+answer_cache = TTLCache(maxsize=ANSWER_CACHE_MAX_SIZE, ttl=ANSWER_CACHE_TTL)
+
+# The instructions and transcript are repeated for every question on the same transcript,
+# so they are sent as a cacheable prefix and only the question changes between requests
+CACHED_PROMPT_TEMPLATE = "Based on the following transcript content from a video or audio file, answer the question below. \n\n " \
+                "Use the information from the transcript to provide your answer. \n\n " \
+                "If the answer is not clear or cannot be determined from the transcript, respond with  \"Unsure about answer.\" . \n\n" \
+                "Please answer in {language}. \n\n " \
+                "Transcript: \n\n" \
+                "{transcript} \n\n "
+
+PROMPT_TEMPLATE = "Question: \n\n" \
+                "{question}"
+
+SYSTEM_PROMPT_TEMPLATE = "You are an assistant trained to answer questions based on the provided transcript content from a video or audio file. \n\n " \
+                "Your responses should be accurate and relevant to the information in the transcript. \n\n " \
+                "If you cannot find an answer based on the content, respond with \"Unsure about answer.\" . \n\n " \
+                "Provide clear and concise answers without unnecessary elaboration. \n\n " \
+                "You will be given a prompt please answer in {language}. \n\n "
 
 def ask_assistant(transcript, question, language, model_id):
     """
@@ -78,31 +114,20 @@ def ask_assistant(transcript, question, language, model_id):
     str
         The generated answer to the question based on the AI model's response.
     """
-    prompt =    "Based on the following transcript content from a video or audio file, answer the question below. \n\n " + \
-                "Use the information from the transcript to provide your answer. \n\n " + \
-                "If the answer is not clear or cannot be determined from the transcript, respond with  \"Unsure about answer.\" . \n\n" + \
-                "Please answer in " + language + ". \n\n "  + \
-                "Transcript: \n\n" + \
-                transcript + " \n\n " + \
-                "Question: \n\n" + \
-                question 
-                
-    system =    "You are an assistant trained to answer questions based on the provided transcript content from a video or audio file. \n\n " + \
-                "Your responses should be accurate and relevant to the information in the transcript. \n\n " + \
-                "If you cannot find an answer based on the content, respond with \"Unsure about answer.\" . \n\n " + \
-                "Provide clear and concise answers without unnecessary elaboration. \n\n " + \
-                "You will be given a prompt please answer in " + language + ". \n\n " 
-   
-    enclosed_prompt = "\n\nHuman: " + \
-    system + " \n\n " + \
-    "Prompt: " + prompt + " \n\n " + \
-    "\n\nAssistant:"
-    
-    response = brt.invoke_model(
-        modelId=model_id, guardrailIdentifier=BEDROCK_GUARDRAIL_IDENTIFIER, guardrailVersion=BEDROCK_GUARDRAIL_VERSION, body=json.dumps(bedrock_utils.get_model_body(model_id, enclosed_prompt, system, prompt))
+    cached_prompt = CACHED_PROMPT_TEMPLATE.format(language=language, transcript=transcript)
+    prompt = PROMPT_TEMPLATE.format(question=question)
+    system = SYSTEM_PROMPT_TEMPLATE.format(language=language)
+
+    response = brt.converse(
+        modelId=model_id,
+        guardrailConfig={
+            'guardrailIdentifier': BEDROCK_GUARDRAIL_IDENTIFIER,
+            'guardrailVersion': BEDROCK_GUARDRAIL_VERSION
+        },
+        **bedrock_utils.get_converse_body(model_id, system, prompt, cached_prompt)
     )
 
-    return bedrock_utils.get_model_response(model_id, response)
+    return bedrock_utils.get_converse_response(response)
 
 def handler(event, context):
     """
@@ -127,30 +152,64 @@ def handler(event, context):
     Exception:
         For any unexpected errors during execution, which are caught and formatted into a response.
     """
-    logger.debug(f"Full event: {event}") # Only log full event in debug mode 
+    logger.debug("Full event: %s", event) # Only log full event in debug mode 
     try:
-        body_json = json.loads(event[constants.BODY])
+        body_json = orjson.loads(event[constants.BODY])
         if constants.QUESTION in body_json:
             question = body_json[constants.QUESTION]
             transcription_job_name = parameter_utils.get_path_parameter(event, constants.TRANSCRIPTION_JOB_NAME_PARAMETER) 
             language = parameter_utils.get_query_string_parameter(event, constants.LANGUAGE_PARAMETER) 
             model_id = bedrock_utils.get_model_id(event) 
+            # Text only clients can pass audio=false to skip the speech synthesis
+            audio_requested = parameter_utils.get_optional_query_string_parameter(event, constants.AUDIO_PARAMETER, 'true').lower() != 'false'
             identity_id = cognito_utils.get_cognito_identity_id(REGION, IDENTITY_POOL_ID, USER_POOL_ID, cognito_utils.get_authorization_token(event))
-             
-            transcription = s3_utils.get_transcription(transcription_job_name, MEDIA_BUCKET, identity_id)
-            
-            answer_key = s3_utils.get_file_key(transcription_job_name, constants.ASSISTANT_FOLDER_PATH, identity_id, model_id=model_id, language=language, timestamp=True)
-            answer, repeated_requested = s3_cache_utils.get_or_generate_bedrock_response(MEDIA_BUCKET, answer_key, ask_assistant, transcription, question, language, model_id)
-            try:
-                audio_key =  s3_utils.get_file_key(transcription_job_name, f'{constants.ASSISTANT_FOLDER_PATH}{constants.AUDIOS_FOLDER_PATH}', identity_id, output_format=constants.MP3, model_id=model_id, language=language, timestamp=True)
-                synthesis_result = s3_cache_utils.get_or_synthesize_speech(MEDIA_BUCKET, audio_key, answer, constants.MP3, language, async_processing=repeated_requested)
+
+            # The transcription of a job does not change, so the job name identifies the transcript of the answer
+            cache_key = hashlib.blake2b('\0'.join((identity_id, transcription_job_name, question, language, model_id)).encode(), digest_size=16).digest()
+            speech_synthesis = []
+            cached_answer = answer_cache.get(cache_key)
+            if cached_answer:
+                answer, answer_key, synthesis_result = cached_answer
+                # Handled like the other repeated requests, an audio synthesized now uses an asynchronous task
+                repeated_requested = True
+            else:
+                # Fetch the transcription while the cached answer is looked up, it is only awaited when the answer needs to be generated
+                transcription = executor.submit(s3_utils.get_transcription, transcription_job_name, MEDIA_BUCKET, identity_id)
+                answer_key = s3_utils.get_file_key(transcription_job_name, constants.ASSISTANT_FOLDER_PATH, identity_id, model_id=model_id, language=language, timestamp=True)
+                audio_key = s3_utils.get_file_key(transcription_job_name, f'{constants.ASSISTANT_FOLDER_PATH}{constants.AUDIOS_FOLDER_PATH}', identity_id, output_format=constants.MP3, model_id=model_id, language=language, timestamp=True)
+                synthesis_result = None
+
+                def generate_answer():
+                    answer = ask_assistant(transcription.result(), question, language, model_id)
+                    # Start the speech synthesis of a new answer while the answer is written to S3.
+                    # The audio key is new as well, so the S3 check for existing audio is skipped and short answers are synthesized synchronously.
+                    if audio_requested:
+                        speech_synthesis.append(executor.submit(polly_utils.synthesize_speech, MEDIA_BUCKET, audio_key, answer, constants.MP3, language, async_processing=False))
+                    return answer
+
+                answer, repeated_requested = s3_cache_utils.get_or_generate_bedrock_response(MEDIA_BUCKET, answer_key, generate_answer)
+
+            # The audio is only synthesized once per answer, a cached answer without audio (not requested, failed or synthesized by a task) is synthesized now
+            if audio_requested and synthesis_result is None:
+                try:
+                    if speech_synthesis:
+                        synthesis_result = speech_synthesis[0].result()
+                    else:
+                        audio_key = s3_utils.get_file_key(transcription_job_name, f'{constants.ASSISTANT_FOLDER_PATH}{constants.AUDIOS_FOLDER_PATH}', identity_id, output_format=constants.MP3, model_id=model_id, language=language, timestamp=True)
+                        synthesis_result = s3_cache_utils.get_or_synthesize_speech(MEDIA_BUCKET, audio_key, answer, constants.MP3, language, async_processing=repeated_requested)
+                except Exception as e:
+                    logger.debug("Polly synthesis failed: %s", str(e)) # Log the exception in debug model but proceed without failing the entire function
+
+            # A speech synthesis task may still fail, only a stored audio is cached with the answer
+            cached_synthesis_result = synthesis_result if synthesis_result and constants.SYNTHESIS_RESULT_AUDIO_KEY in synthesis_result else None
+            answer_cache[cache_key] = (answer, answer_key, cached_synthesis_result)
+
+            if audio_requested and synthesis_result:
                 if constants.SYNTHESIS_RESULT_TASK_ID in synthesis_result:
                     return response_utils.send_response_speech_synthesis(answer, answer_key, synthesis_result[constants.SYNTHESIS_RESULT_TASK_ID])
                 elif constants.SYNTHESIS_RESULT_AUDIO_KEY in synthesis_result:
                     return response_utils.send_response_with_file_key_and_audio_key(answer, answer_key, synthesis_result[constants.SYNTHESIS_RESULT_AUDIO_KEY])
-            except Exception as e:
-                logger.debug(f"Polly synthesis failed: {str(e)}") # Log the exception in debug model but proceed without failing the entire function
-            
+
             return response_utils.send_response_with_file_key(answer, answer_key)
         else:
             return response_utils.format_response(code=constants.BAD_REQUEST_CODE, body={
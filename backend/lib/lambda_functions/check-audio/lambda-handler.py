@@ -5,9 +5,8 @@ This Lambda function interacts with Amazon Polly to monitor the status of S3 syn
 
 Imports:
 --------
-- boto3: AWS SDK for Python to interact with AWS services.
-- os: Provides access to environment variables.
 - logging: Provides log levels and structured logging.
+- concurrent.futures.ThreadPoolExecutor: Used to retrieve the tasks of batch requests concurrently.
 - constants: Defines constants used throughout the module (imported from Lambda layer).
 - parameter_utils: Custom utility functions for extracting parameters from the event (imported from Lambda layer).
 - response_utils: Custom utility functions for formatting and sending responses (imported from Lambda layer).
@@ -15,20 +14,22 @@ Imports:
 
 AWS Clients:
 -------------
-- `polly`: Boto3 client for interacting with Amazon Polly.
+- `polly`: Client for interacting with Amazon Polly, shared with polly_utils.
 
 Functions:
 ----------
 1. get_speech_synthesis_task(task_id) -> dict:
    Retrieves the details of a specified task id from Amazon Polly.
 
-2. handler(event: dict, context: object) -> dict:
-   Main entry point for the Lambda function. Handles the event, retrieves the task id and responds with the status.
+2. get_synthesis_task_status(synthesis_task: dict) -> tuple:
+   Builds the response status code and body for a speech synthesis task.
+
+3. handler(event: dict, context: object) -> dict:
+   Main entry point for the Lambda function. Handles the event, retrieves the task id, or the list of task ids, and responds with the status.
 """
 
-import boto3
-import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import constants # from layer
 import parameter_utils # from layer
 import response_utils # from layer
@@ -37,8 +38,19 @@ import polly_utils # from layer
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-REGION = os.environ[constants.REGION]
-polly = boto3.client('polly', region_name=REGION)\
+# polly_utils already creates the Polly client at import, the same client is used to check the tasks
+polly = polly_utils.polly
+executor = ThreadPoolExecutor(max_workers=10)
+
+# Response bodies that do not depend on the request, built once per container
+FAILED_BODY = {
+    "status": constants.FAILED_STATUS,
+    'message': "Text synthesis task to audio failed."
+}
+PROCESSING_BODY = {
+    "status": constants.PROCESSING_STATUS,
+    'message': "The text is still ongoing the audio synthesis process."
+}
 
 def get_speech_synthesis_task(task_id):
     """
@@ -63,12 +75,37 @@ def get_speech_synthesis_task(task_id):
         logger.debug("An error occurred: %s", str(e))
         raise e
         
+def get_synthesis_task_status(synthesis_task):
+    """
+    Builds the response status code and body for a speech synthesis task.
+
+    Args:
+        synthesis_task (dict): The details of the speech synthesis task returned by Amazon Polly.
+
+    Returns:
+        tuple: The HTTP status code and the response body for the task status.
+    """
+    # Polly returns lowercase statuses: 'scheduled', 'inProgress', 'completed' or 'failed'
+    task_status = synthesis_task[constants.TASK_STATUS]
+    if task_status == constants.POLLY_COMPLETED_STATUS:
+        return constants.OK_CODE, {
+                'status': constants.COMPLETED_STATUS,
+                'audioFileKey': polly_utils.extract_file_key_from_url(synthesis_task[constants.OUTPUT_URI])
+            }
+    elif task_status == constants.POLLY_FAILED_STATUS:
+        return constants.INTERNAL_SERVER_ERROR_CODE, FAILED_BODY
+    else:
+        return constants.PROCESSING_CODE, PROCESSING_BODY
+
 def handler(event, context):
     """
     AWS Lambda function handler to process the status of a speech synthesis task.
 
     This function retrieves the synthesis task ID from the event, fetches the task details,
     and returns a response indicating whether the task is completed, failed, or still processing.
+    Requests without task ID path parameter can check up to 20 tasks at once with the `taskIds` query string
+    parameter (comma-separated), the statuses are returned in a list in the same order. A task that cannot be
+    retrieved (e.g., an unknown task ID) is reported with the code and message of its error in its entry.
 
     Args:
         event (dict): The event data passed to the Lambda function, which should include the synthesis task ID.
@@ -84,25 +121,34 @@ def handler(event, context):
         Exception: If there is an error in processing the event or retrieving the task details, 
                    the exception is caught and formatted into a response using the `format_exception` utility.
     """
-    logger.debug(f"Full event: {event}") # Only log full event in debug mode 
+    logger.debug("Full event: %s", event) # Only log full event in debug mode 
     try:
+        if not (event.get('pathParameters') or {}).get(constants.SYNTHESIS_TASK_ID_PARAMETER):
+            synthesis_task_ids = parameter_utils.get_list_query_string_parameter(event, constants.SYNTHESIS_TASK_IDS_PARAMETER)
+            if not synthesis_task_ids:
+                return response_utils.format_response(code=constants.BAD_REQUEST_CODE, body={
+                        "status": constants.BAD_REQUEST_STATUS,
+                        'message': "Missing task ids in request. At least one task id is needed."
+                    })
+            if len(synthesis_task_ids) > constants.MAX_BATCH_SIZE:
+                return response_utils.format_response(code=constants.BAD_REQUEST_CODE, body={
+                        "status": constants.BAD_REQUEST_STATUS,
+                        'message': f"Too many task ids in request. At most {constants.MAX_BATCH_SIZE} tasks can be checked at once."
+                    })
+            tasks = []
+            futures = [executor.submit(get_speech_synthesis_task, synthesis_task_id) for synthesis_task_id in synthesis_task_ids]
+            for synthesis_task_id, future in zip(synthesis_task_ids, futures):
+                try:
+                    code, body = get_synthesis_task_status(future.result())
+                except Exception as e:
+                    # The other tasks are still reported, the error is returned in the entry of this task
+                    code, status, message = response_utils.get_exception_details(e)
+                    body = {'status': status, 'message': message}
+                tasks.append({'taskId': synthesis_task_id, 'code': code, **body})
+            return response_utils.format_conditional_response(event, code=constants.OK_CODE, body={'tasks': tasks})
+
         synthesis_task_id = parameter_utils.get_path_parameter(event, constants.SYNTHESIS_TASK_ID_PARAMETER)
-        synthesis_task = get_speech_synthesis_task(synthesis_task_id)
-        if synthesis_task[constants.TASK_STATUS].upper() == constants.COMPLETED_STATUS:
-            return response_utils.format_response(code=constants.OK_CODE, body={
-                    'status': constants.COMPLETED_STATUS,
-                    'audioFileKey': polly_utils.extract_file_key_from_url(synthesis_task[constants.OUTPUT_URI])
-                })
-        elif synthesis_task[constants.TASK_STATUS].upper() == constants.FAILED_STATUS:
-            return response_utils.format_response(code=constants.INTERNAL_SERVER_ERROR_CODE, body={
-                    "status": constants.FAILED_STATUS,
-                    'message': "Text synthesis task to audio failed."
-                })
-        else:
-            return response_utils.format_response(code=constants.PROCESSING_CODE, body={
-                    "status": constants.PROCESSING_STATUS,
-                    'message': "The text is still ongoing the audio synthesis process."
-                })
+        code, body = get_synthesis_task_status(get_speech_synthesis_task(synthesis_task_id))
+        return response_utils.format_conditional_response(event, code=code, body=body)
     except Exception as e:
         return response_utils.format_exception(e)
-            
\ No newline at end of file
@@ -5,14 +5,15 @@ This Lambda function interacts with Amazon Transcribe to monitor the status of t
 
 Imports:
 --------
-- boto3: AWS SDK for Python to interact with AWS services.
 - os: Provides access to environment variables.
 - logging: Provides log levels and structured logging.
+- concurrent.futures.ThreadPoolExecutor: Used to retrieve the jobs of batch requests concurrently.
 - constants: Defines constants used throughout the module (imported from Lambda layer).
 - parameter_utils: Custom utility functions for extracting parameters from the event (imported from Lambda layer).
 - response_utils: Custom utility functions for formatting and sending responses (imported from Lambda layer).
-- cognito_utils: Custom utility functions for handling AWS Cognito operations (imported from Lambda layer).
-- s3_utils: Custom utility functions for interacting with S3 (imported from Lambda layer).
+- client_utils: Custom utility functions for creating AWS service clients (imported from Lambda layer).
+- cognito_utils: Custom utility functions for handling AWS Cognito operations (imported from Lambda layer, only when the job is completed).
+- s3_utils: Custom utility functions for interacting with S3 (imported from Lambda layer, only when the job is completed).
 - polly_utils: Custom utility functions for using Amazon Polly to synthesize speech (imported from Lambda layer).
 
 Environment Variables:
@@ -31,18 +32,26 @@ Functions:
 1. get_transcription_job(transcription_job_name: str) -> dict:
    Retrieves the details of a specified transcription job from Amazon Transcribe.
 
-2. handler(event: dict, context: object) -> dict:
-   Main entry point for the Lambda function. Handles the event, retrieves the transcription job details, processes the transcription file, and responds with the status and file location.
+2. get_transcription_status(event: dict, transcription_job_name: str, transcription_job: dict, move_file: bool = True) -> tuple:
+   Processes the transcription file of a completed job and builds the response status code and body for the job.
+
+3. get_temporary_file_key(transcription_job_name: str) -> str:
+   Returns the S3 key where Amazon Transcribe writes the transcription file of a job.
+
+4. move_transcription_files(event: dict, transcription_job_names: list):
+   Moves the transcription files of several completed jobs together, with a single listing and a single delete request.
+
+5. handler(event: dict, context: object) -> dict:
+   Main entry point for the Lambda function. Handles the event, retrieves the transcription job details, or the details of a list of jobs, processes the transcription file, and responds with the status and file location.
 """
 
-import boto3
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import constants # from layer
 import parameter_utils # from layer
-import cognito_utils # from layer
 import response_utils # from layer
-import s3_utils # from layer
+import client_utils # from layer
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -50,7 +59,18 @@ MEDIA_BUCKET = os.environ[constants.MEDIA_BUCKET]
 REGION = os.environ[constants.REGION]
 IDENTITY_POOL_ID = os.environ[constants.IDENTITY_POOL_ID]
 USER_POOL_ID = os.environ[constants.USER_POOL_ID]
-transcribe = boto3.client('transcribe', region_name=REGION)\
+transcribe = client_utils.get_client('transcribe', REGION)
+executor = ThreadPoolExecutor(max_workers=10)
+
+# Response bodies that do not depend on the request, built once per container
+NOT_FOUND_BODY = {
+    "status": constants.NOT_FOUND_STATUS,
+    'message': "Transcription job not found."
+}
+PROCESSING_BODY = {
+    "status": constants.PROCESSING_STATUS,
+    'message': "Video is still ongoing the transcription process."
+}
 
 def get_transcription_job(transcription_job_name):
     response = transcribe.get_transcription_job(
@@ -58,36 +78,84 @@ def get_transcription_job(transcription_job_name):
     )
     return response[constants.TRANSCRIPTION_JOB]
 
+def get_transcription_status(event, transcription_job_name, transcription_job, move_file=True):
+    transcription_job_status = transcription_job[constants.TRANSCRIPTION_JOB_STATUS]
+
+    if transcription_job_status == constants.COMPLETED_STATUS:
+        # Only needed once the job is completed, imported here so the polling requests don't load them on cold starts
+        import cognito_utils # from layer
+        import s3_utils # from layer
+        identity_id = cognito_utils.get_cognito_identity_id(REGION, IDENTITY_POOL_ID, USER_POOL_ID, cognito_utils.get_authorization_token(event))
+        file_key = s3_utils.get_file_key(transcription_job_name, constants.TRANSCRIPTIONS_FOLDER_PATH, identity_id)
+        if move_file:
+            s3_utils.move_s3_object(MEDIA_BUCKET, get_temporary_file_key(transcription_job_name), MEDIA_BUCKET, file_key)
+
+        return constants.OK_CODE, {
+                'status': constants.COMPLETED_STATUS,
+                'language': transcription_job[constants.LANGUAGE_CODE],
+                'fileKey': file_key
+            }
+    elif transcription_job_status == constants.NOT_FOUND_STATUS:
+        return constants.NOT_FOUND_CODE, NOT_FOUND_BODY
+    else:
+        return constants.PROCESSING_CODE, PROCESSING_BODY
+
+def get_temporary_file_key(transcription_job_name):
+    return f'{constants.TEMPORARY_FOLDER_PATH}{constants.TRANSCRIPTIONS_FOLDER_PATH}{transcription_job_name}.json'
+
+def move_transcription_files(event, transcription_job_names):
+    import cognito_utils # from layer
+    import s3_utils # from layer
+    identity_id = cognito_utils.get_cognito_identity_id(REGION, IDENTITY_POOL_ID, USER_POOL_ID, cognito_utils.get_authorization_token(event))
+    key_pairs = [
+        (get_temporary_file_key(transcription_job_name), s3_utils.get_file_key(transcription_job_name, constants.TRANSCRIPTIONS_FOLDER_PATH, identity_id))
+        for transcription_job_name in transcription_job_names
+    ]
+    # With several completed jobs, a single listing checks which transcription files were already moved
+    known_keys = s3_utils.list_keys_with_prefix(MEDIA_BUCKET, f'{identity_id}/{constants.TRANSCRIPTIONS_FOLDER_PATH}') if len(key_pairs) > 1 else None
+    s3_utils.move_s3_objects(MEDIA_BUCKET, MEDIA_BUCKET, key_pairs, known_keys)
+
 def handler(event, context):
-    logger.debug(f"Full event: {event}") # Only log full event in debug mode 
+    logger.debug("Full event: %s", event) # Only log full event in debug mode 
     try:
+        if not (event.get('pathParameters') or {}).get(constants.TRANSCRIPTION_JOB_NAME_PARAMETER):
+            # Batch request: the jobs are retrieved concurrently, the files of the completed jobs are then moved together
+            transcription_job_names = parameter_utils.get_list_query_string_parameter(event, constants.TRANSCRIPTION_JOB_NAMES_PARAMETER)
+            if not transcription_job_names:
+                return response_utils.format_response(code=constants.BAD_REQUEST_CODE, body={
+                        "status": constants.BAD_REQUEST_STATUS,
+                        'message': "Missing transcription job names in request. At least one job name is needed."
+                    })
+            if len(transcription_job_names) > constants.MAX_BATCH_SIZE:
+                return response_utils.format_response(code=constants.BAD_REQUEST_CODE, body={
+                        "status": constants.BAD_REQUEST_STATUS,
+                        'message': f"Too many transcription job names in request. At most {constants.MAX_BATCH_SIZE} jobs can be checked at once."
+                    })
+            futures = [executor.submit(get_transcription_job, transcription_job_name) for transcription_job_name in transcription_job_names]
+            # A job that cannot be retrieved (e.g., an unknown job name) is reported in its entry, the other jobs are still checked
+            transcription_jobs = {}
+            errors = {}
+            for transcription_job_name, future in zip(transcription_job_names, futures):
+                try:
+                    transcription_jobs[transcription_job_name] = future.result()
+                except Exception as e:
+                    errors[transcription_job_name] = e
+            completed_job_names = [transcription_job_name for transcription_job_name, transcription_job in transcription_jobs.items()
+                                   if transcription_job[constants.TRANSCRIPTION_JOB_STATUS] == constants.COMPLETED_STATUS]
+            if completed_job_names:
+                move_transcription_files(event, completed_job_names)
+            transcriptions = []
+            for transcription_job_name in transcription_job_names:
+                if transcription_job_name in errors:
+                    code, status, message = response_utils.get_exception_details(errors[transcription_job_name])
+                    body = {'status': status, 'message': message}
+                else:
+                    code, body = get_transcription_status(event, transcription_job_name, transcription_jobs[transcription_job_name], move_file=False)
+                transcriptions.append({'transcriptionJobName': transcription_job_name, 'code': code, **body})
+            return response_utils.format_conditional_response(event, code=constants.OK_CODE, body={'transcriptions': transcriptions})
+
         transcription_job_name = parameter_utils.get_path_parameter(event, constants.TRANSCRIPTION_JOB_NAME_PARAMETER) 
-        transcription_job = get_transcription_job(transcription_job_name)
-        
-        if transcription_job[constants.TRANSCRIPTION_JOB_STATUS] == constants.COMPLETED_STATUS:
-            identity_id = cognito_utils.get_cognito_identity_id(REGION, IDENTITY_POOL_ID, USER_POOL_ID, cognito_utils.get_authorization_token(event))
-            temp_file_key = f'{constants.TEMPORARY_FOLDER_PATH}{constants.TRANSCRIPTIONS_FOLDER_PATH}{transcription_job_name}.json'
-            file_key = s3_utils.get_file_key(transcription_job_name, constants.TRANSCRIPTIONS_FOLDER_PATH, identity_id)
-            s3_utils.move_s3_object(MEDIA_BUCKET, temp_file_key, MEDIA_BUCKET, file_key)
-
-            return response_utils.format_response(code=constants.OK_CODE, body={
-                    'status': constants.COMPLETED_STATUS,
-                    'language': transcription_job[constants.LANGUAGE_CODE],
-                    'fileKey': file_key
-                })
-        elif transcription_job['TranscriptionJobStatus'] == 'NOT_FOUND':
-            return response_utils.format_response(code=constants.NOT_FOUND_CODE, body={
-                    "status": constants.NOT_FOUND_STATUS,
-                    'message': "Transcription job not found."
-                })
-        else:
-            return response_utils.format_response(code=constants.PROCESSING_CODE, body={
-                    "status": constants.PROCESSING_STATUS,
-                    'message': "Video is still ongoing the transcription process."
-                })
+        code, body = get_transcription_status(event, transcription_job_name, get_transcription_job(transcription_job_name))
+        return response_utils.format_conditional_response(event, code=code, body=body)
     except Exception as e:
         return response_utils.format_exception(e)
-            
-        
-    
-    
\ No newline at end of file
@@ -5,11 +5,12 @@ This Lambda function get a list of available foundation models.
 
 Imports:
 --------
-- boto3: AWS SDK for Python to interact with AWS services.
 - os: Provides access to environment variables.
 - logging: Provides log levels and structured logging.
+- time: Used to expire the cached model map.
 - constants: Defines constants used throughout the module (imported from Lambda layer).
 - response_utils: Custom utility functions for formatting and sending responses (imported from Lambda layer).
+- client_utils: Custom utility functions for creating AWS service clients (imported from Lambda layer).
 
 AWS Clients:
 -------------
@@ -23,21 +24,29 @@ Functions:
 2. build_model_map(models):
    Builds a dictionary mapping model names to model IDs.
 
-3. handler(event: dict, context: object) -> dict:
+3. get_model_map():
+   Returns the model map, built from the available foundation models at most once per hour in each container.
+
+4. handler(event: dict, context: object) -> dict:
    Main entry point for the Lambda function. Handles the event and returns the response from the get_models function.
 
 """
-import boto3
 import os
 import logging
+import time
 import constants # from layer
 import response_utils # from layer
+import client_utils # from layer
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 REGION = os.environ[constants.REGION]
-brt = boto3.client(service_name='bedrock', region_name=REGION)\
+brt = client_utils.get_client('bedrock', REGION)
+
+# The available models rarely change, the model map is kept between warm invocations and refreshed every hour
+MODEL_MAP_TTL = 3600 # seconds
+_MODEL_MAP_CACHE = {'expires': 0, 'model_map': None}
     
 def get_models():
     """
@@ -73,16 +82,32 @@ def build_model_map(models):
     model_map = {}
     
     for model in models:
-        model_name = model["providerName"] + " " + model["modelName"]
-        index_v = model["modelId"].find('-v')
-        if index_v != -1:
-            version = model["modelId"][index_v + 1:]
-            model_name = model["providerName"] + " " + model["modelName"] + " " + version
         model_id = model['modelId']
-        model_map[model_name] = model_id
+        # The version is the suffix after the last '-v' of the model id (e.g. 'v1:0')
+        _, separator, version = model_id.rpartition('-v')
+        if separator:
+            model_map[f'{model["providerName"]} {model["modelName"]} v{version}'] = model_id
+        else:
+            model_map[f'{model["providerName"]} {model["modelName"]}'] = model_id
 
     return model_map
 
+def get_model_map():
+    """
+    Returns the dictionary mapping model names to model IDs.
+    The map is cached in the container and only rebuilt from `list_foundation_models` once it expired.
+
+    Returns:
+    --------
+    dict
+        A dictionary mapping model names to model IDs.
+    """
+    now = time.monotonic()
+    if _MODEL_MAP_CACHE['model_map'] is None or now >= _MODEL_MAP_CACHE['expires']:
+        _MODEL_MAP_CACHE['model_map'] = build_model_map(get_models())
+        _MODEL_MAP_CACHE['expires'] = now + MODEL_MAP_TTL
+    return _MODEL_MAP_CACHE['model_map']
+
 def handler(event, context):
     """
     Calls the get_models function and returns the response.
@@ -99,10 +124,9 @@ def handler(event, context):
     dict
         The response from the get_models function, containing the list of available foundation models.
     """
-    logger.debug(f"Full event: {event}") # Only log full event in debug mode 
+    logger.debug("Full event: %s", event) # Only log full event in debug mode 
     try:
-        models = get_models()
-        model_map = build_model_map(models)
+        model_map = get_model_map()
         return response_utils.format_response(code=constants.OK_CODE, body={
                 'modelMap': model_map
         })
@@ -5,17 +5,12 @@ This Lambda function processes transcription data stored in Amazon S3, generates
 
 Imports:
 --------
-- json: Used for handling JSON data.
-- boto3: AWS SDK for Python to interact with AWS services.
 - os: Provides access to environment variables.
 - logging: Provides log levels and structured logging.
 - constants: Defines constants used throughout the module (imported from Lambda layer).
-- parameter_utils: Custom utility functions for extracting parameters from the event (imported from Lambda layer).
-- response_utils: Custom utility functions for formatting and sending responses (imported from Lambda layer).
+- client_utils: Custom utility functions for creating AWS service clients (imported from Lambda layer).
 - bedrock_utils: Custom utility functions for interacting with Bedrock AI models (imported from Lambda layer).
-- cognito_utils: Custom utility functions for handling AWS Cognito operations (imported from Lambda layer).
-- s3_utils: Custom utility functions for interacting with S3 (imported from Lambda layer).
-- s3_cache_utils: Custom utility functions for caching and retrieving responses from Amazon S3. 
+- text_generation_utils: Request flow shared by the functions that generate a text from a transcription (imported from Lambda layer).
 
 Environment Variables:
 ----------------------
@@ -37,27 +32,35 @@ Functions:
    Main entry point for the Lambda function. Handles the event, retrieves the transcription, generates a summary, and stores the summary in S3.
 """
 
-import json
-import boto3
 import os
 import logging
 import constants # from layer
-import parameter_utils # from layer
-import response_utils # from layer
+import client_utils # from layer
 import bedrock_utils # from layer
-import cognito_utils # from layer
-import s3_utils # from layer
-import s3_cache_utils # from layer
+import text_generation_utils # from layer
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
-MEDIA_BUCKET = os.environ[constants.MEDIA_BUCKET]
 REGION = os.environ[constants.REGION]
-IDENTITY_POOL_ID = os.environ[constants.IDENTITY_POOL_ID]
-USER_POOL_ID = os.environ[constants.USER_POOL_ID]
 BEDROCK_GUARDRAIL_IDENTIFIER = os.environ[constants.BEDROCK_GUARDRAIL_IDENTIFIER]
 BEDROCK_GUARDRAIL_VERSION = os.environ[constants.BEDROCK_GUARDRAIL_VERSION]
-brt = boto3.client(service_name='bedrock-runtime', region_name=REGION)\
+brt = client_utils.get_client('bedrock-runtime', REGION)
+
+# The system prompt and the transcription are the same for every language and sent as a cacheable prefix,
+# only the instructions after the transcription change between requests
+SYSTEM_PROMPT = "You are an advanced summarization assistant. \n\n " \
+                "Your role is to provide concise and accurate summaries of given transcriptions. \n\n " \
+                "Ensure your summaries highlight all the essential points, main ideas, and critical information. \n\n " \
+                "Please provide a direct response without any introductory phrases or preamble. \n\n "
+
+# Sent as a separate text block before the transcription, so the transcription is not copied into a new string
+TRANSCRIPTION_PREFIX = "Here is the transcription of a lecture: \n\n"
+
+PROMPT_TEMPLATE = "Summarize the transcription above. \n\n " \
+                "Focus on capturing the main points, ideas, and crucial information. \n\n " \
+                "Provide the summary in a list format with bullet points. \n\n " \
+                "Please provide a direct response without any introductory phrases or preamble. \n\n " \
+                "Please answer in {language}. \n\n "
     
 def get_summary(transcription, language, model_id):
     """
@@ -77,28 +80,18 @@ def get_summary(transcription, language, model_id):
     str
         The generated summary text.
     """
-    prompt =    "Summarize the following transcription of a lecture. \n\n " + \
-                "Focus on capturing the main points, ideas, and crucial information. \n\n " + \
-                "Provide the summary in a list format with bullet points. \n\n " + \
-                "Please provide a direct response without any introductory phrases or preamble. \n\n " + \
-                "Here is the transcription: \n\n" + \
-                transcription + " \n\n " 
-    
-    system =    "You are an advanced summarization assistant. \n\n " + \
-                "Your role is to provide concise and accurate summaries of given transcriptions. \n\n " + \
-                "Ensure your summaries highlight all the essential points, main ideas, and critical information. \n\n " + \
-                "Please provide a direct response without any introductory phrases or preamble. \n\n " + \
-                "You will be given a prompt please answer in " + language + ". \n\n " 
-    
-    enclosed_prompt = "\n\nHuman: " + \
-    system + " \n\n " + \
-    "Prompt: " + prompt + " \n\n " + \
-    "\n\nAssistant:"
-    response = brt.invoke_model(
-        modelId=model_id, guardrailIdentifier=BEDROCK_GUARDRAIL_IDENTIFIER, guardrailVersion=BEDROCK_GUARDRAIL_VERSION, body=json.dumps(bedrock_utils.get_model_body(model_id, enclosed_prompt, system, prompt))
+    prompt = PROMPT_TEMPLATE.format(language=language)
+
+    response = brt.converse(
+        modelId=model_id,
+        guardrailConfig={
+            'guardrailIdentifier': BEDROCK_GUARDRAIL_IDENTIFIER,
+            'guardrailVersion': BEDROCK_GUARDRAIL_VERSION
+        },
+        **bedrock_utils.get_converse_body(model_id, SYSTEM_PROMPT, prompt, [TRANSCRIPTION_PREFIX, transcription])
     )
 
-    return bedrock_utils.get_model_response(model_id, response)
+    return bedrock_utils.get_converse_response(response)
 
 def handler(event, context):
     """
@@ -122,29 +115,5 @@ def handler(event, context):
     Exception:
         For any unexpected errors during execution, which are caught and formatted into a response.
     """
-    logger.debug(f"Full event: {event}") # Only log full event in debug mode 
-    try:
-        transcription_job_name = parameter_utils.get_path_parameter(event, constants.TRANSCRIPTION_JOB_NAME_PARAMETER) 
-        language = parameter_utils.get_query_string_parameter(event, constants.LANGUAGE_PARAMETER) 
-        model_id = bedrock_utils.get_model_id(event) 
-        identity_id = cognito_utils.get_cognito_identity_id(REGION, IDENTITY_POOL_ID, USER_POOL_ID, cognito_utils.get_authorization_token(event))
-        
-        transcription = s3_utils.get_transcription(transcription_job_name, MEDIA_BUCKET, identity_id)
-        summary_key = s3_utils.get_file_key(transcription_job_name, constants.SUMMARIES_FOLDER_PATH, identity_id, model_id=model_id, language=language)
-        summary, repeated_requested = s3_cache_utils.get_or_generate_bedrock_response(MEDIA_BUCKET, summary_key, get_summary, transcription, language, model_id)
-        try:
-            audio_key = s3_utils.get_file_key(transcription_job_name, f'{constants.SUMMARIES_FOLDER_PATH}{constants.AUDIOS_FOLDER_PATH}', identity_id, output_format=constants.MP3, model_id=model_id, language=language)
-            synthesis_result = s3_cache_utils.get_or_synthesize_speech(MEDIA_BUCKET, audio_key, summary, constants.MP3, language, async_processing=repeated_requested)
-            if constants.SYNTHESIS_RESULT_TASK_ID in synthesis_result:
-                return response_utils.send_response_speech_synthesis(summary, summary_key, synthesis_result[constants.SYNTHESIS_RESULT_TASK_ID])
-            elif constants.SYNTHESIS_RESULT_AUDIO_KEY in synthesis_result:
-                return response_utils.send_response_with_file_key_and_audio_key(summary, summary_key, synthesis_result[constants.SYNTHESIS_RESULT_AUDIO_KEY])
-        except Exception as e:
-            logger.debug(f"Polly synthesis failed: {str(e)}") # Log the exception in debug model but proceed without failing the entire function
-
-        return response_utils.send_response_with_file_key(summary, summary_key)
-    
-    except Exception as e:
-        return response_utils.format_exception(e)
-    
-    
\ No newline at end of file
+    logger.debug("Full event: %s", event) # Only log full event in debug mode 
+    return text_generation_utils.run_text_generation(event, constants.SUMMARIES_FOLDER_PATH, get_summary)
@@ -5,9 +5,10 @@ This Lambda function handles the translation of data stored in Amazon S3. It ret
 
 Imports:
 ---------
-- boto3: AWS SDK for Python to interact with AWS services.
 - os: Provides access to environment variables.
+- re: Used to split long texts at sentence boundaries.
 - logging: Provides log levels and structured logging.
+- concurrent.futures.ThreadPoolExecutor: Used to translate the chunks of long texts concurrently and to synthesize the speech of a new translation while it is saved to S3.
 - parameter_utils: Custom utility functions for extracting parameters from the event (imported from Lambda layer).
 - constants: Defines constants used throughout the module (imported from Lambda layer).
 - cognito_utils: Custom utility functions for handling AWS Cognito operations (imported from Lambda layer).
@@ -15,7 +16,8 @@ Imports:
 - response_utils: Custom utility functions for formatting and sending responses (imported from Lambda layer).
 - polly_utils: Custom utility functions for interacting with Amazon Polly (imported from Lambda layer).
 - s3_cache_utils: Custom utility functions for caching and retrieving responses from Amazon S3. 
-- bedrock_utils: Custom utility functions for interacting with Bedrock AI models (imported from Lambda layer).
+- bedrock_utils: Custom utility functions for interacting with Bedrock AI models (imported from Lambda layer when translating summaries).
+- client_utils: Custom utility functions for creating AWS service clients (imported from Lambda layer).
 
 Environment Variables:
 ----------------------
@@ -30,23 +32,33 @@ AWS Clients:
 
 Functions:
 ----------
-1. get_translation(text: str, source_language: str, target_language: str) -> str:
+1. get_supported_languages() -> frozenset:
+   Returns the language codes supported by Amazon Translate, cached for the lifetime of the container.
+
+2. prewarm_supported_languages():
+   Loads the supported languages in the background during the cold start.
+
+3. split_text(text: str) -> list:
+   Splits a text into chunks that fit in a single Amazon Translate request.
+
+4. get_translation(text: str, source_language: str, target_language: str) -> str:
    Translates the provided text from the source language to the target language using Amazon Translate.
 
-2. handler(event: dict, context: object) -> dict:
+5. handler(event: dict, context: object) -> dict:
    Main entry point for the Lambda function. Processes the incoming event, retrieves and translates the content, and stores the translated content and optionally the synthesized audio in S3.
 
 """
-import boto3
 import os
+import re
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import parameter_utils # from layer
 import constants # from layer
 import cognito_utils # from layer
 import s3_utils # from layer
 import response_utils # from layer
 import s3_cache_utils # from layer
-import bedrock_utils # from layer
+import client_utils # from layer
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -54,11 +66,90 @@ MEDIA_BUCKET = os.environ[constants.MEDIA_BUCKET]
 REGION = os.environ[constants.REGION]
 IDENTITY_POOL_ID = os.environ[constants.IDENTITY_POOL_ID]
 USER_POOL_ID = os.environ[constants.USER_POOL_ID]
-translate = boto3.client('translate', region_name=REGION)\
+translate = client_utils.get_client('translate', REGION)
+executor = ThreadPoolExecutor(max_workers=8)
+
+# Amazon Translate accepts at most 10,000 bytes of UTF-8 text per TranslateText request,
+# longer texts are split into chunks at sentence boundaries and translated concurrently
+TRANSLATE_MAX_CHUNK_BYTES = 9500
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])(\s+)')
+
+# Amazon Polly language prefixes that have a different code in Amazon Translate
+POLLY_TO_TRANSLATE_LANGUAGE_CODES = {
+    "nb": "no",
+}
+
+# Language codes supported by Amazon Translate, listed once per container on the first translation
+_SUPPORTED_LANGUAGES = None
+
+def get_supported_languages():
+    """
+    Returns the language codes supported by Amazon Translate.
+    The list is requested once and kept for the lifetime of the Lambda container.
+
+    Returns:
+    --------
+    frozenset
+        The supported language codes (e.g., 'en', 'es').
+    """
+    global _SUPPORTED_LANGUAGES
+    if _SUPPORTED_LANGUAGES is None:
+        _SUPPORTED_LANGUAGES = frozenset(lang[constants.LANGUAGE_CODE] for lang in translate.list_languages()[constants.LANGUAGES])
+    return _SUPPORTED_LANGUAGES
+
+def prewarm_supported_languages():
+    """
+    Loads the supported languages during the cold start, so the first translation reuses the open connection
+    to Amazon Translate and the cached language list. Any error is only logged, the list is then requested
+    again on the first translation.
+    """
+    try:
+        get_supported_languages()
+    except Exception as e:
+        logger.debug("Translate prewarm call failed: %s", str(e))
+
+executor.submit(prewarm_supported_languages)
+
+def split_text(text):
+    """
+    Splits a text into chunks of at most TRANSLATE_MAX_CHUNK_BYTES UTF-8 bytes, at sentence boundaries.
+    Sentences longer than the limit are split at the byte limit, without breaking multi-byte characters.
+
+    Parameters:
+    -----------
+    text : str
+        The text to be split.
+
+    Returns:
+    --------
+    list of str
+        The chunks of the text, each one ends with the whitespace that followed it in the text.
+    """
+    chunks = []
+    current_chunk, current_size = [], 0
+    parts = SENTENCE_BOUNDARY.split(text) # Sentences and the whitespace between them: [sentence, separator, sentence, ...]
+    for i in range(0, len(parts), 2):
+        piece = parts[i] + (parts[i + 1] if i + 1 < len(parts) else '')
+        size = len(piece.encode())
+        if current_chunk and current_size + size > TRANSLATE_MAX_CHUNK_BYTES:
+            chunks.append(''.join(current_chunk))
+            current_chunk, current_size = [], 0
+        while size > TRANSLATE_MAX_CHUNK_BYTES:
+            head = piece.encode()[:TRANSLATE_MAX_CHUNK_BYTES].decode('utf-8', 'ignore')
+            chunks.append(head)
+            piece = piece[len(head):]
+            size = len(piece.encode())
+        current_chunk.append(piece)
+        current_size += size
+    if current_chunk:
+        chunks.append(''.join(current_chunk))
+    return chunks
 
 def get_translation(text, source_language, target_language):
     """
     Translates the provided text from the source language to the target language using Amazon Translate.
+    Texts longer than a single request accepts are split with `split_text` and the chunks are translated concurrently.
+    When both languages have the same Amazon Translate code the text is returned as is, without calling Amazon Translate.
 
     Parameters:
     -----------
@@ -79,16 +170,28 @@ def get_translation(text, source_language, target_language):
         ValueError
         If there are issues with the content type or format.
     """
-    translate_languages = translate.list_languages()[constants.LANGUAGES]
-    translate_supported_languages = {lang[constants.LANGUAGE_CODE] for lang in translate_languages}
+    if source_language == target_language:
+        return text
+
+    translate_supported_languages = get_supported_languages()
     if source_language in translate_supported_languages\
         and target_language in translate_supported_languages:
-        response = translate.translate_text(
-            Text=text,
-            SourceLanguageCode=source_language,
-            TargetLanguageCode=target_language
-        )
-        return response[constants.TRANSLATED_TEXT]
+        def translate_text(chunk):
+            response = translate.translate_text(
+                Text=chunk,
+                SourceLanguageCode=source_language,
+                TargetLanguageCode=target_language
+            )
+            return response[constants.TRANSLATED_TEXT]
+
+        if len(text.encode()) <= TRANSLATE_MAX_CHUNK_BYTES:
+            return translate_text(text)
+
+        chunks = split_text(text)
+        # Translate drops the whitespace at the end of each chunk, it is added back when joining the translations
+        separators = [chunk[len(chunk.rstrip()):] for chunk in chunks]
+        translations = executor.map(translate_text, (chunk.rstrip() or chunk for chunk in chunks))
+        return ''.join(translation + separator for translation, separator in zip(translations, separators))
     else:
         raise ValueError(f"Source language {source_language} or target language {target_language} not supported by Amazon Translate.")
 
@@ -108,9 +211,7 @@ def get_translate_language_code(language_code):
         The new language code to be used by Amazon Translate
     """
     language_code = language_code[:2]
-    if language_code == "nb":
-        language_code = "no"
-    return language_code
+    return POLLY_TO_TRANSLATE_LANGUAGE_CODES.get(language_code, language_code)
 
 def handler(event, context):
     """
@@ -138,12 +239,11 @@ def handler(event, context):
     Exception
         For any other unexpected errors during execution.
     """
-    logger.debug(f"Full event: {event}") # Only log full event in debug mode 
+    logger.debug("Full event: %s", event) # Only log full event in debug mode 
     try:
         transcription_job_name = parameter_utils.get_path_parameter(event, constants.TRANSCRIPTION_JOB_NAME_PARAMETER) 
         resource_path = parameter_utils.get_query_string_parameter(event, constants.RESOURCE_PATH_PARAMETER) 
         source_language = parameter_utils.get_query_string_parameter(event, constants.SOURCE_LANGUAGE_PARAMETER) 
-        model_id = bedrock_utils.get_model_id(event) 
         destination_language = parameter_utils.get_query_string_parameter(event, constants.DESTINATION_LANGUAGE_PARAMETER) 
         identity_id = cognito_utils.get_cognito_identity_id(REGION, IDENTITY_POOL_ID, USER_POOL_ID, cognito_utils.get_authorization_token(event))
         text = ""
@@ -152,6 +252,9 @@ def handler(event, context):
             translation_key = s3_utils.get_file_key(transcription_job_name, f'{constants.TRANSLATIONS_FOLDER_PATH}{resource_path}', identity_id, language=destination_language)
             audio_key = s3_utils.get_file_key(transcription_job_name, f'{constants.TRANSLATIONS_FOLDER_PATH}{constants.AUDIOS_FOLDER_PATH}', identity_id, output_format=constants.MP3, language=destination_language)
         elif resource_path == constants.SUMMARIES_FOLDER_PATH:
+            # Only needed to locate summaries, imported here so translations of transcriptions don't load it on cold starts
+            import bedrock_utils # from layer
+            model_id = bedrock_utils.get_model_id(event)
             text = s3_utils.get_json_from_s3(MEDIA_BUCKET, s3_utils.get_file_key(transcription_job_name, resource_path, identity_id, model_id=model_id, language=source_language))
             translation_key = s3_utils.get_file_key(transcription_job_name, f'{constants.TRANSLATIONS_FOLDER_PATH}{resource_path}', identity_id, model_id=model_id, language=destination_language)
             audio_key = s3_utils.get_file_key(transcription_job_name, f'{constants.TRANSLATIONS_FOLDER_PATH}{constants.AUDIOS_FOLDER_PATH}', identity_id, output_format=constants.MP3, model_id=model_id, language=destination_language)
@@ -161,15 +264,26 @@ def handler(event, context):
                     "message": "Resource path is not transcriptions, summaries, judgments or information."
                 })   
         
-        translation, repeated_requested = s3_cache_utils.get_or_generate_bedrock_response(MEDIA_BUCKET, translation_key, get_translation, text, get_translate_language_code(source_language), get_translate_language_code(destination_language))
+        speech_synthesis = []
+
+        def generate_translation():
+            translation = get_translation(text, get_translate_language_code(source_language), get_translate_language_code(destination_language))
+            # Start the speech synthesis of a new translation while it is written to S3
+            speech_synthesis.append(executor.submit(s3_cache_utils.get_or_synthesize_speech, MEDIA_BUCKET, audio_key, translation, constants.MP3, destination_language, async_processing=False))
+            return translation
+
+        translation, repeated_requested = s3_cache_utils.get_or_generate_bedrock_response(MEDIA_BUCKET, translation_key, generate_translation)
         try:
-            synthesis_result = s3_cache_utils.get_or_synthesize_speech(MEDIA_BUCKET, audio_key, translation, constants.MP3, destination_language, async_processing=repeated_requested)
+            if speech_synthesis:
+                synthesis_result = speech_synthesis[0].result()
+            else:
+                synthesis_result = s3_cache_utils.get_or_synthesize_speech(MEDIA_BUCKET, audio_key, translation, constants.MP3, destination_language, async_processing=repeated_requested)
             if constants.SYNTHESIS_RESULT_TASK_ID in synthesis_result:
                 return response_utils.send_response_speech_synthesis(translation, translation_key, synthesis_result[constants.SYNTHESIS_RESULT_TASK_ID])
             elif constants.SYNTHESIS_RESULT_AUDIO_KEY in synthesis_result:
                 return response_utils.send_response_with_file_key_and_audio_key(translation, translation_key, synthesis_result[constants.SYNTHESIS_RESULT_AUDIO_KEY])
         except Exception as e:
-            logger.debug(f"Polly synthesis failed: {str(e)}") # Log the exception in debug model but proceed without failing the entire function
+            logger.debug("Polly synthesis failed: %s", str(e)) # Log the exception in debug model but proceed without failing the entire function
         
         return response_utils.send_response_with_file_key(translation, translation_key)
     
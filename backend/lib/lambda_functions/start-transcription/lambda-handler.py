@@ -7,15 +7,17 @@ and returns a formatted response.
 
 Imports:
 ---------
-- boto3: AWS SDK for Python to interact with AWS services.
 - botocore.exceptions.ClientError: Exception raised for errors returned by AWS services.
 - os: Provides access to environment variables.
-- json: Used for handling JSON data.
+- orjson: Used for parsing JSON data.
 - logging: Provides log levels and structured logging.
+- cachetools.TTLCache: Size and time bounded cache for the transcription jobs started in this container.
 - constants: Defines constants used throughout the module (imported from Lambda layer).
 - cognito_utils: Custom utility functions for handling AWS Cognito operations (imported from Lambda layer).
 - response_utils: Custom utility functions for formatting and sending responses (imported from Lambda layer).
 - hash_utils: Custom utility functions for hashing (imported from Lambda layer).
+- s3_utils: Custom utility functions for interacting with S3 (imported from Lambda layer).
+- client_utils: Custom utility functions for creating AWS service clients (imported from Lambda layer).
 
 Environment Variables:
 ----------------------
@@ -38,15 +40,17 @@ Functions:
 
 """
 
-import boto3
 from botocore.exceptions import ClientError
 import os
-import json
+import orjson
 import logging
+from cachetools import TTLCache
 import constants # from layer
 import cognito_utils # from layer
 import response_utils # from layer
 import hash_utils # from layer
+import s3_utils # from layer
+import client_utils # from layer
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -54,11 +58,19 @@ MEDIA_BUCKET = os.environ[constants.MEDIA_BUCKET]
 REGION = os.environ[constants.REGION]
 IDENTITY_POOL_ID = os.environ[constants.IDENTITY_POOL_ID]
 USER_POOL_ID = os.environ[constants.USER_POOL_ID]
-transcribe_client = boto3.client('transcribe', region_name=REGION)\
+transcribe_client = client_utils.get_client('transcribe', REGION)
+
+# Transcription jobs started or found in this container, keyed by (identity_id, transcription_job_name).
+# Job names are deterministic, so repeated requests for the same file skip Transcribe and S3.
+STARTED_JOBS_CACHE_MAX_SIZE = 1024
+STARTED_JOBS_CACHE_TTL = 3600 # seconds
+started_jobs = TTLCache(maxsize=STARTED_JOBS_CACHE_MAX_SIZE, ttl=STARTED_JOBS_CACHE_TTL)
 
 def start_transcription_job(transcription_job_name, file_key, identity_id):
     """
     Initiates a transcription job using AWS Transcribe service.
+    The job is not started again if it was already started from this container or if its transcription
+    is already stored in S3, since the job name is derived from the file key.
 
     Parameters:
     -----------
@@ -80,6 +92,15 @@ def start_transcription_job(transcription_job_name, file_key, identity_id):
         For general errors, including:
             - AWS Transcribe client errors (e.g., ConflictException if the job already exists).
     """
+    job_key = (identity_id, transcription_job_name)
+    if job_key in started_jobs or \
+            s3_utils.check_s3_file_exists(MEDIA_BUCKET, s3_utils.get_file_key(transcription_job_name, constants.TRANSCRIPTIONS_FOLDER_PATH, identity_id)):
+        logger.debug("The transcription job %s was already started. Continuing with this job.", transcription_job_name)
+        started_jobs[job_key] = True
+        return response_utils.format_response(code=constants.OK_CODE, body={
+                    'transcriptionJobName': transcription_job_name,
+        })
+
     try:
         transcribe_client.start_transcription_job(
             TranscriptionJobName= f'{transcription_job_name}', 
@@ -95,6 +116,7 @@ def start_transcription_job(transcription_job_name, file_key, identity_id):
             logger.debug("A transcription job with this name already exists. Continuing with this job.") 
         else:
             raise e
+    started_jobs[job_key] = True
     return response_utils.format_response(code=constants.OK_CODE, body={
                 'transcriptionJobName': transcription_job_name,
     })
@@ -120,9 +142,9 @@ def handler(event, context):
     Exception
         For general errors encountered during event processing and transcription job initiation.
     """
-    logger.debug(f"Full event: {event}") # Only log full event in debug mode 
+    logger.debug("Full event: %s", event) # Only log full event in debug mode 
     try:
-        body_json = json.loads(event[constants.BODY])
+        body_json = orjson.loads(event[constants.BODY])
         if constants.FILE_KEY in body_json:
             file_key = body_json[constants.FILE_KEY]
             transcription_job_name = hash_utils.deterministic_hash(file_key)
@@ -1,29 +1,70 @@
 """
 bedrock_utils.py
 
-This module contains utility functions for handling responses from various language models and 
-constructing request bodies for those models.
+This module contains utility functions for constructing Bedrock Converse API requests for the
+supported models and for handling their responses.
+
+Imports:
+---------
+- logging: Provides log levels and structured logging.
+- constants: Defines constants used throughout the module (imported from Lambda layer).
+- parameter_utils: Custom utility functions for extracting parameters from the event (imported from Lambda layer).
 
 Functions:
 -----------
 - get_model_id(event)
-- get_model_response(model_id, response)
-- get_model_body(model_id, enclosed_prompt, system, prompt)
+- get_base_model_id(model_id)
+- supports_prompt_caching(model_id)
+- supports_system_prompt(model_id)
+- get_converse_body(model_id, system, prompt, cached_prompt)
+- get_converse_response(response)
 
 Exceptions:
 ------------
-- KeyError: Raised if expected keys are not found in the response body or body configuration.
-- ValueError: Raised if the response body is not in the expected format (e.g., not a JSON object).
+- KeyError: Raised if the model response does not contain a text message.
 """
 
-import json
 import logging
+import constants # from layer
+import parameter_utils # from layer
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 DEFAULT_BEDROCK_MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
 
+# Geographic prefixes of cross-region inference profile IDs (e.g. 'us.anthropic.claude-3-5-haiku-20241022-v1:0')
+INFERENCE_PROFILE_PREFIXES = ("us.", "us-gov.", "eu.", "apac.", "global.")
+
+# Models that accept cachePoint blocks in the Converse API.
+# Check https://docs.aws.amazon.com/bedrock/latest/userguide/prompt-caching.html for updated values.
+PROMPT_CACHING_MODEL_IDS = (
+    "anthropic.claude-3-5-haiku",
+    "anthropic.claude-3-7-sonnet",
+    "anthropic.claude-sonnet-4",
+    "anthropic.claude-opus-4",
+    "amazon.nova",
+)
+
+# Models that reject the system field in the Converse API, the system prompt is sent as part of the user message instead.
+# Check https://docs.aws.amazon.com/bedrock/latest/userguide/conversation-inference-supported-models-features.html for updated values.
+SYSTEM_PROMPT_UNSUPPORTED_MODEL_IDS = (
+    "amazon.titan-text",
+    "ai21.j2",
+    "cohere.command-text",
+    "cohere.command-light-text",
+    "mistral.mistral-7b-instruct",
+    "mistral.mixtral-8x7b-instruct",
+)
+
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+INFERENCE_CONFIG = {
+    "maxTokens": 1000,
+    "temperature": 0.5,
+    "topP": 1,
+}
+
 def get_model_id(event):
     """
     Extracts the model identifier from an event dictionary, using a default value if not provided.
@@ -37,213 +78,137 @@ def get_model_id(event):
     --------
     str
         The model identifier extracted from the event's query string parameters. If the model identifier
-        is not present in the query parameters, a default value is returned.
+        is not present in the query parameters, or the request has no query parameters, a default value is returned.
     """
-    if event['queryStringParameters']:
-        return event['queryStringParameters'].get('modelId', DEFAULT_BEDROCK_MODEL_ID)
+    return parameter_utils.get_optional_query_string_parameter(event, constants.MODEL_ID_PARAMETER, DEFAULT_BEDROCK_MODEL_ID)
 
-
-def get_model_response(model_id: str, response: dict) -> str:
+def get_base_model_id(model_id: str) -> str:
     """
-    Extracts and returns the generated text from a model response based on the model identifier.
+    Returns the model ID without the geographic prefix of cross-region inference profiles, so model families
+    can be matched on the start of the ID.
 
     Parameters:
     -----------
     model_id : str
-        The identifier for the model which determines the structure of the response and how to 
-        extract the text.
-    response : dict
-        The response object from the model which contains the generated text.
+        The model or inference profile identifier (e.g., 'us.anthropic.claude-3-5-haiku-20241022-v1:0').
 
     Returns:
     --------
     str
-        The generated text from the model response.
+        The base model identifier (e.g., 'anthropic.claude-3-5-haiku-20241022-v1:0').
+    """
+    if model_id.startswith(INFERENCE_PROFILE_PREFIXES):
+        return model_id.split('.', 1)[1]
+    return model_id
 
-    Raises:
-    -------
-    KeyError
-        If expected keys are not found in the response body based on the `model_id`.
-    ValueError
-        If the response body cannot be parsed as JSON or is not in the expected format.
+def supports_prompt_caching(model_id: str) -> bool:
+    """
+    Checks if a model supports prompt caching through cachePoint blocks in the Converse API.
 
-    Notes:
-    ------
-    - The function assumes that `response["body"].read()` returns a JSON object and attempts to 
-      parse it to extract the text based on the model ID.
-    - Supports a variety of model identifiers including:
-        - "amazon.titan"
-        - "ai21.j2"
-        - "anthropic.claude-3"
-        - "anthropic.claude"
-        - "cohere"
-        - "meta.llama2"
-        - "mistral"
-    - For unsupported or unrecognized `model_id`, the function returns an empty string.
+    Parameters:
+    -----------
+    model_id : str
+        The identifier for the model.
+
+    Returns:
+    --------
+    bool
+        True if the model supports prompt caching, False otherwise.
     """
-    try:
-        response_body = json.loads(response["body"].read())
-    except (json.JSONDecodeError, TypeError) as e:
-        raise ValueError(f"Error parsing response body: {e}")
-
-    try:
-        if "amazon.titan" in model_id:
-            text = response_body["results"][0]['outputText']
-        elif "ai21.j2" in model_id:
-            text = response_body["completions"][0]['data']['text']
-        elif "ai21.jamba" in model_id:
-            text = response_body['choices'][0]['message']['content']
-        elif 'anthropic.claude-3' in model_id:
-            text = response_body["content"][0]['text']
-        elif 'anthropic.claude' in model_id:
-            text = response_body["completion"]
-        elif 'cohere' in model_id:
-            text = response_body['generations'][0]['text']
-        elif 'meta.llama' in model_id:
-            text = response_body['generation']
-        elif 'mistral' in model_id:
-            text = response_body['outputs'][0]['text']
-        else:
-            raise KeyError(f"Unrecognized model_id: {model_id}. The backend cannot process this model id and needs to be updated.")
-
-        return text
-    except Exception as e:
-        raise e
-
-def get_model_body(model_id: str, enclosed_prompt: str, system: str = None, prompt: str = None) -> dict:
+    return get_base_model_id(model_id).startswith(PROMPT_CACHING_MODEL_IDS)
+
+def supports_system_prompt(model_id: str) -> bool:
     """
-    Constructs and returns the request body for a specified model based on the model identifier.
+    Checks if a model accepts a system prompt in the Converse API.
 
     Parameters:
     -----------
     model_id : str
-        The identifier for the model which determines the structure of the request body.
-    enclosed_prompt : str
-        The prompt text to be included in the request body.
-    system : str, optional
-        Optional system configuration or context for models requiring it (e.g., Anthropic Claude-3).
-    prompt : str, optional
-        Optional prompt text to be used for models requiring a specific prompt format (e.g., Anthropic Claude).
+        The identifier for the model.
 
     Returns:
     --------
-    dict
-        The request body formatted for the specified model.
+    bool
+        True if the model accepts a system prompt, False otherwise.
+    """
+    return not get_base_model_id(model_id).startswith(SYSTEM_PROMPT_UNSUPPORTED_MODEL_IDS)
 
-    Raises:
-    -------
-    KeyError
-        If the provided `model_id` is not recognized or if required parameters for constructing
-        the body are missing.
+def get_converse_body(model_id: str, system: str, prompt: str, cached_prompt: str = None) -> dict:
+    """
+    Constructs and returns the keyword arguments for a Bedrock Converse API call.
+
+    When the model supports prompt caching, a cache checkpoint is placed after the system prompt and
+    after `cached_prompt`, so repeated requests sharing the same prefix (e.g. follow-up questions on
+    the same transcript) reuse the cached prefix and only `prompt` is processed again.
+
+    Parameters:
+    -----------
+    model_id : str
+        The identifier for the model which determines the features used in the request.
+    system : str
+        The system prompt for the model.
+    prompt : str
+        The part of the user message that changes between requests.
+    cached_prompt : str or list of str, optional
+        The part of the user message that is repeated between requests and placed before `prompt`.
+        A list is sent as consecutive text blocks, so long texts (e.g. a transcription) are sent
+        without copying them into a single prompt string. Empty parts are skipped.
+
+    Returns:
+    --------
+    dict
+        The `system`, `messages` and `inferenceConfig` arguments for `converse`.
 
     Notes:
     ------
-    - The function constructs request bodies tailored for a range of model identifiers including:
-        - "amazon.titan"
-        - "ai21.j2"
-        - "anthropic.claude-3"
-        - "anthropic.claude"
-        - "cohere"
-        - "meta.llama2"
-        - "mistral"
-    - For unrecognized `model_id`, the function returns an empty dictionary.
+    - For models that do not accept a system prompt, it is sent as the first block of the user message.
     """
-    body = {}
-    if "amazon.titan" in model_id:
-        body = {
-            "inputText": enclosed_prompt,
-            "textGenerationConfig": {
-                "temperature": 0.5,
-                "topP": 1,
-                "maxTokenCount": 1000,
-                "stop_sequences": ["\n\nHuman:"]
-            }
-        }
-    elif "ai21.j2" in model_id:
-        body = {
-            "prompt": enclosed_prompt,
-            "temperature": 0.5,
-            "topP": 1,
-            "maxTokens": 1000,
-            "stop_sequences": ["\n\nHuman:"]
-            #"countPenalty": {
-            #    "scale": 0.5
-            #},
-            #"presencePenalty": {
-            #    "scale": 0.5
-            #},
-            # "frequencyPenalty": {
-            #    "scale": 0.5
-            #}
-        }
-    elif "ai21.jamba" in model_id:
-        body = {
-            "max_tokens": 1000,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.5,
-            "top_p": 1,
-            "stop": ["\n\nHuman:"],
-        }
-    elif 'anthropic.claude-3' in model_id:
-        body = {
-            "max_tokens": 1000,
-            "system": system,
-            "messages": [{"role": "user", "content": prompt}],
-            "anthropic_version": "bedrock-2023-05-31",
-            "temperature": 0.5,
-            "top_p": 1,
-            #"top_k": int,
-            #"tools": [{
-            #      "name": string,
-            #      "description": string,
-            #      "input_schema": json
-            #}],
-            #"tool_choice": {
-            #    "type" :  string,
-            #    "name" : string,
-            #},
-            "stop_sequences": ["\n\nHuman:"]
-        }
-    elif 'anthropic.claude' in model_id:
-        body = {
-            "prompt": enclosed_prompt,
-            "temperature": 0.5,
-            "top_p": 1,
-            #"top_k": 1,
-            "max_tokens_to_sample": 1000,
-            "stop_sequences": ["\n\nHuman:"]
-        }
-    elif 'cohere' in model_id:
-        body = {
-            "prompt": enclosed_prompt,
-            "temperature": 0.5,
-            "p": 1,
-            #"k": 0,
-            "max_tokens": 1000,
-            "stop_sequences": ["\n\nHuman:"],
-            #"return_likelihoods": "GENERATION|ALL|NONE",
-            #"stream": boolean,
-            #"num_generations": int,
-            #"logit_bias": {token_id: bias},
-            #"truncate": "NONE|START|END"
-        }
-    elif 'meta.llama' in model_id:
-        body = {
-            "prompt": enclosed_prompt,
-            "temperature": 0.5,
-            "top_p": 1,
-            "max_gen_len": 1000
-        }
-    elif 'mistral' in model_id:
-        body = {
-            "prompt": enclosed_prompt,
-            "max_tokens" : 1000,
-            "stop" : ["\n\nHuman:"],
-            "temperature": 0.5,
-            "top_p": 1,
-            #"top_k": int
-        }
+    cache = supports_prompt_caching(model_id)
+    content = []
+    if cached_prompt:
+        for text in ([cached_prompt] if isinstance(cached_prompt, str) else cached_prompt):
+            if text:
+                content.append({"text": text})
+        if cache:
+            content.append(CACHE_POINT)
+    content.append({"text": prompt})
+
+    body = {
+        "messages": [{"role": "user", "content": content}],
+        "inferenceConfig": INFERENCE_CONFIG,
+    }
+    if supports_system_prompt(model_id):
+        body["system"] = [{"text": system}, CACHE_POINT] if cache else [{"text": system}]
     else:
-        raise KeyError(f"Unrecognized model_id: {model_id}. The backend cannot process this model id and needs to be updated.")
+        content.insert(0, {"text": system})
 
     return body
+
+def get_converse_response(response: dict) -> str:
+    """
+    Extracts and returns the generated text from a Bedrock Converse API response.
+
+    Parameters:
+    -----------
+    response : dict
+        The response object from the `converse` call.
+
+    Returns:
+    --------
+    str
+        The generated text from the model response.
+
+    Raises:
+    -------
+    KeyError
+        If the response does not contain a text message.
+    """
+    # Logged to CloudWatch to monitor the prompt cache hits
+    usage = response.get("usage", {})
+    logger.info("Bedrock usage: %s input tokens, %s output tokens, %s cache read tokens, %s cache write tokens",
+                usage.get("inputTokens"), usage.get("outputTokens"), usage.get("cacheReadInputTokens", 0), usage.get("cacheWriteInputTokens", 0))
+
+    for block in response["output"]["message"]["content"]:
+        if "text" in block:
+            return block["text"]
+    raise KeyError("Model response does not contain a text message.")
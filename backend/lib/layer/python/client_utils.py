@@ -0,0 +1,51 @@
+"""
+client_utils.py
+
+This module provides utility functions for creating AWS service clients shared by the Lambda functions.
+Clients are created once at module import and reused across warm invocations, so the configuration
+below keeps connections alive between requests instead of repeating the TCP and TLS handshakes.
+Clients are created from a single botocore session, which avoids importing boto3 and loads each
+service model only once per container.
+
+Imports:
+---------
+- botocore.session: Low level AWS SDK session used to create the service clients.
+- botocore.config.Config: Configuration for the connection pool, timeouts and retries of the clients.
+
+Functions:
+-----------
+- get_client(service_name: str, region_name: str)
+"""
+import botocore.session
+from botocore.config import Config
+
+CLIENT_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    retries={
+        'mode': 'adaptive',
+        'max_attempts': 3
+    },
+    connect_timeout=2,
+    read_timeout=60
+)
+
+session = botocore.session.get_session()
+
+def get_client(service_name: str, region_name: str):
+    """
+    Creates a client for the given service using the shared session and client configuration.
+
+    Parameters:
+    -----------
+    service_name : str
+        The name of the AWS service (e.g., 'bedrock-runtime', 'polly', 'transcribe').
+    region_name : str
+        The AWS region of the service endpoint (e.g., 'us-west-2').
+
+    Returns:
+    --------
+    botocore.client.BaseClient
+        The client for the service, with the same interface as a boto3 client.
+    """
+    return session.create_client(service_name, region_name=region_name, config=CLIENT_CONFIG)
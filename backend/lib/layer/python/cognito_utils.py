@@ -5,27 +5,50 @@ Module for interacting with AWS Cognito to retrieve identity IDs and authorizati
 
 Imports:
 ---------
-- boto3: AWS SDK for Python to interact with AWS services.
 - os: Provides access to environment variables.
 - logging: Provides log levels and structured logging.
+- base64: Used to decode the payload of the authorization token.
+- json: Used for handling JSON data.
+- time: Used to check the expiration of cached identities.
+- functools.lru_cache: Used to build the Cognito logins key once per user pool.
+- hashlib: Used to key cached identities on a digest of the token when it has no subject.
+- cachetools.TTLCache: Size and time bounded cache for the resolved identities.
 - constants: Defines constants used throughout the module (imported from Lambda layer).
+- client_utils: Custom utility functions for creating AWS service clients (imported from Lambda layer).
 
 Functions:
 -----------
 - get_authorization_token(event)
+- get_token_claims(authorization_token: str) -> dict
+- get_logins_key(region: str, user_pool_id: str) -> str
 - get_cognito_identity_id(region: str, identity_pool_id: str, user_pool_id: str, authorization_token: str) -> str
 
 """
-import boto3
 import os
 import logging
+import base64
+import json
+import time
+import hashlib
+from functools import lru_cache
+from cachetools import TTLCache
 import constants # from layer
+import client_utils # from layer
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 REGION = os.environ[constants.REGION]
-cognito_identity = boto3.client('cognito-identity', region_name=REGION)\
+cognito_identity = client_utils.get_client('cognito-identity', REGION)
+
+# Identity IDs resolved in this container: {(identity_pool_id, sub): (identity_id, expiration)}.
+# Tokens without a subject are keyed on their SHA-256 digest, the raw token is never stored.
+# Lambda keeps module globals between warm invocations, so repeated requests from the same user skip Cognito.
+# Entries are dropped after 5 minutes, or earlier when the token expires, and at most 1024 users are kept.
+IDENTITY_CACHE_MAX_SIZE = 1024
+IDENTITY_CACHE_TTL = 300 # seconds
+IDENTITY_CACHE_EXPIRATION_MARGIN = 30 # seconds, cached identities are not used when the token is about to expire
+_IDENTITY_CACHE = TTLCache(maxsize=IDENTITY_CACHE_MAX_SIZE, ttl=IDENTITY_CACHE_TTL)
 
 def get_authorization_token(event):
     """
@@ -60,6 +83,55 @@ def get_authorization_token(event):
     else:
         raise KeyError("Missing user identifier (sub) in request context authorizer claim.")
 
+def get_token_claims(authorization_token: str) -> dict:
+    """
+    Decodes the claims from the payload of a Cognito User Pool JWT.
+
+    The signature is not verified here, the token has already been validated by the
+    API Gateway Cognito authorizer before the Lambda function is invoked.
+
+    Parameters:
+    -----------
+    authorization_token : str
+        The authorization token from the Cognito User Pool.
+
+    Returns:
+    --------
+    dict
+        The claims contained in the token payload (e.g. `sub`, `exp`).
+
+    Raises:
+    -------
+    ValueError
+        If the token is not a well formed JWT.
+    """
+    try:
+        payload = authorization_token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)  # Restore the base64 padding removed in JWTs
+        return json.loads(base64.urlsafe_b64decode(payload))
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"Invalid authorization token: {e}")
+
+@lru_cache(maxsize=8)
+def get_logins_key(region: str, user_pool_id: str) -> str:
+    """
+    Returns the Cognito Identity logins key of a Cognito User Pool.
+    The region and user pool of a Lambda function never change, so the key is built once per container.
+
+    Parameters:
+    -----------
+    region : str
+        The AWS region where the Cognito User Pool is located (e.g., 'us-west-2').
+    user_pool_id : str
+        The ID of the Cognito User Pool.
+
+    Returns:
+    --------
+    str
+        The logins key (e.g., 'cognito-idp.us-west-2.amazonaws.com/us-west-2_abc').
+    """
+    return f'cognito-idp.{region}.amazonaws.com/{user_pool_id}'
+
 def get_cognito_identity_id(region : str, identity_pool_id:str, user_pool_id: str, authorization_token: str) -> str:
     """
     Retrieves a Cognito Identity ID using the AWS Cognito Identity service.
@@ -68,6 +140,10 @@ def get_cognito_identity_id(region : str, identity_pool_id:str, user_pool_id: st
     an identity ID from AWS Cognito. It constructs the logins key for the Cognito Identity service and
     handles any exceptions that may occur during the process.
 
+    The identity ID is cached for the token subject (or the SHA-256 of the token when it has no subject)
+    for up to 5 minutes, and never in the last 30 seconds before the token expiration,
+    so warm invocations for the same user do not call Cognito again.
+
     Parameters:
     -----------
     region : str
@@ -87,7 +163,7 @@ def get_cognito_identity_id(region : str, identity_pool_id:str, user_pool_id: st
     Raises:
     -------
     ValueError
-        If the 'IdentityId' key is not found in the response from Cognito.
+        If the authorization token is malformed or the 'IdentityId' key is not found in the response from Cognito.
     botocore.exceptions.ClientError
         For errors related to AWS Cognito services, such as:
             - InvalidParameterException: If the parameters provided are invalid.
@@ -95,17 +171,24 @@ def get_cognito_identity_id(region : str, identity_pool_id:str, user_pool_id: st
             - NotAuthorizedException: If the authorization token is invalid or expired.
             - InternalError: For internal errors from the Cognito service.
     """
-    logins_key = f'cognito-idp.{region}.amazonaws.com/{user_pool_id}'
+    claims = get_token_claims(authorization_token)
+    cache_key = (identity_pool_id, claims.get('sub') or hashlib.sha256(authorization_token.encode()).hexdigest())
+    cached = _IDENTITY_CACHE.get(cache_key)
+    if cached and time.time() < cached[1] - IDENTITY_CACHE_EXPIRATION_MARGIN:
+        return cached[0]
+
     try:
         response = cognito_identity.get_id(
             IdentityPoolId=identity_pool_id,
             Logins={
-                logins_key: authorization_token
+                get_logins_key(region, user_pool_id): authorization_token
             }
         )
         if 'IdentityId' not in response:
             raise ValueError("IdentityId not found in the response.")
-        
+
+        if 'exp' in claims:
+            _IDENTITY_CACHE[cache_key] = (response['IdentityId'], claims['exp'])
         return response['IdentityId']
     
     except Exception as e:
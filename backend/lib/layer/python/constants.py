@@ -22,7 +22,12 @@ LANGUAGE_PARAMETER = 'language'
 SOURCE_LANGUAGE_PARAMETER = 'source_language'
 DESTINATION_LANGUAGE_PARAMETER = 'destination_language'
 RESOURCE_PATH_PARAMETER = 'resource_path'
+MODEL_ID_PARAMETER = 'modelId'
 SYNTHESIS_TASK_ID_PARAMETER = "taskId"
+AUDIO_PARAMETER = 'audio'
+SYNTHESIS_TASK_IDS_PARAMETER = 'taskIds'
+TRANSCRIPTION_JOB_NAMES_PARAMETER = 'transcriptionJobNames'
+MAX_BATCH_SIZE = 20
 SYNTHESIS_RESULT_TASK_ID ='task_id'
 SYNTHESIS_RESULT_AUDIO_KEY = 'audio_key'
 BODY = 'body'
@@ -42,6 +47,8 @@ TRANSCRIPTION_JOB = 'TranscriptionJob'
 TASK_STATUS = 'TaskStatus'
 OUTPUT_URI = 'OutputUri'
 SYNTHESIS_TASK = 'SynthesisTask'
+POLLY_COMPLETED_STATUS = 'completed'
+POLLY_FAILED_STATUS = 'failed'
 
 # Service Response Status
 COMPLETED_STATUS = "COMPLETED"
@@ -81,6 +88,8 @@ PIPELINE_NAME = 'PIPELINE_NAME'
 NUMBER_OF_FLASHCARDS = 'NUMBER_OF_FLASHCARDS'
 BEDROCK_GUARDRAIL_IDENTIFIER = 'BEDROCK_GUARDRAIL_IDENTIFIER'
 BEDROCK_GUARDRAIL_VERSION = 'BEDROCK_GUARDRAIL_VERSION'
+JSON_CACHE_MAX_SIZE = 'JSON_CACHE_MAX_SIZE'
+JSON_CACHE_TTL = 'JSON_CACHE_TTL'
 
 # File formats
 MP3 = "mp3"
\ No newline at end of file
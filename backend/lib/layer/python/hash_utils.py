@@ -7,26 +7,37 @@ deterministic hashes of file keys.
 Functions:
 ----------
 1. deterministic_hash(file_key):
-   Generates a deterministic hash based on the file key, using SHA-256 and base64 encoding with filtered characters.
+   Generates a deterministic hash based on the file key, using SHA-256 and URL-safe base64 encoding.
    
 """
 
 import hashlib
 import base64
+import string
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Characters allowed in transcription job names, the hash only uses a subset of them
 ALLOWED_CHARS_HASH = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._-'
+# Characters of the URL-safe base64 encoding used by the hash
+URLSAFE_BASE64_CHARS = string.ascii_letters + string.digits + '-_'
 
+# deterministic_hash does not filter its output, checked once at import so a change of the allowed characters fails on cold start
+if not set(URLSAFE_BASE64_CHARS) <= set(ALLOWED_CHARS_HASH):
+    raise ValueError("The URL-safe base64 alphabet must be a subset of ALLOWED_CHARS_HASH.")
+
+# The hash only depends on the file key, keys hashed again in the same container (e.g. retried uploads) are reused
+@lru_cache(maxsize=1024)
 def deterministic_hash(file_key):
     """
-    Generates a deterministic hash based on the file key, using SHA-256 and base64 encoding with filtered characters.
+    Generates a deterministic hash based on the file key, using SHA-256 and URL-safe base64 encoding.
 
     The function extracts a substring from the file key starting from the occurrence of the word "videos", 
-    if present. It then computes a SHA-256 hash of the substring, encodes it in base64, and filters out 
-    any characters not in the allowed set.
+    if present. It then computes a SHA-256 hash of the substring and encodes it in URL-safe base64 without padding,
+    which only uses characters of the allowed set.
 
     Parameters:
     -----------
@@ -51,15 +62,8 @@ def deterministic_hash(file_key):
     hash_object = hashlib.sha256(result.encode())
     
     # Use base64 encoding to convert the hash to a string
-    hash_str = base64.urlsafe_b64encode(hash_object.digest()).decode('utf-8')
-    
-    # Remove padding characters from the base64 encoding
-    hash_str = hash_str.rstrip('=')
-    
-    # Define the set of allowed characters
-    allowed_chars = set(ALLOWED_CHARS_HASH)
-    
-    # Filter out any characters not in the allowed set
-    filtered_hash = ''.join(char for char in hash_str if char in allowed_chars)
+    hash_str = base64.urlsafe_b64encode(hash_object.digest()).decode('ascii')
     
-    return filtered_hash
\ No newline at end of file
+    # Remove padding characters from the base64 encoding.
+    # The URL-safe base64 alphabet only contains allowed characters, so no other character needs to be filtered out
+    return hash_str.rstrip('=')
@@ -11,16 +11,21 @@ Functions:
 - get_query_string_parameter(event: dict, param_name: str) -> str
   Retrieves a specified query string parameter from the event object.
 
+- get_optional_query_string_parameter(event: dict, param_name: str, default: str = None) -> str
+  Retrieves a specified query string parameter from the event object, or a default value if it is missing.
+
+- get_list_query_string_parameter(event: dict, param_name: str) -> list
+  Retrieves a comma-separated query string parameter from the event object as a list of values.
+
 Usage:
 ------
 These functions are designed to handle extraction of path and query string parameters
 from an event dictionary, such as those used in AWS Lambda functions or API Gateway events.
 """
-import logging
+# Returned by dict.get when a parameter is missing, parameters set to None are returned as they are
+MISSING = object()
+
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-    
 def get_path_parameter(event: dict, param_name: str) -> str:
     """
     Retrieves a path parameter from the event object.
@@ -42,15 +47,12 @@ def get_path_parameter(event: dict, param_name: str) -> str:
     KeyError
         If the path parameter is missing from the event object.
     """
-    try:
-        path_parameters = event.get('pathParameters', {})
-        if param_name in path_parameters:
-            return path_parameters[param_name]
-        else:
-            raise KeyError(f"Missing path parameter: {param_name}")
-    except Exception as e:
-        logger.warning(e)
-        raise e
+    # API Gateway sets the parameters to None when the request has none
+    path_parameters = event.get('pathParameters') or {}
+    value = path_parameters.get(param_name, MISSING)
+    if value is MISSING:
+        raise KeyError(f"Missing path parameter: {param_name}")
+    return value
 
 
 def get_query_string_parameter(event: dict, param_name: str) -> str:
@@ -74,12 +76,56 @@ def get_query_string_parameter(event: dict, param_name: str) -> str:
     KeyError
         If the query string parameter is missing from the event object.
     """
-    try:
-        query_string_parameters = event.get('queryStringParameters', {})
-        if param_name in query_string_parameters:
-            return query_string_parameters[param_name]
-        else:
-            raise KeyError(f"Missing query string parameter: {param_name}")
-    except Exception as e:
-        logger.warning(e)
-        raise e
\ No newline at end of file
+    # API Gateway sets the parameters to None when the request has none
+    query_string_parameters = event.get('queryStringParameters') or {}
+    value = query_string_parameters.get(param_name, MISSING)
+    if value is MISSING:
+        raise KeyError(f"Missing query string parameter: {param_name}")
+    return value
+
+
+def get_optional_query_string_parameter(event: dict, param_name: str, default: str = None) -> str:
+    """
+    Retrieves an optional query string parameter from the event object.
+
+    Parameters:
+    -----------
+    event : dict
+        The event dictionary containing the query string parameters.
+    param_name : str
+        The name of the query string parameter to retrieve.
+    default : str, optional
+        The value returned when the query string parameter is missing (default is None).
+
+    Returns:
+    --------
+    str
+        The value of the specified query string parameter, or the default value if it is missing.
+    """
+    query_string_parameters = event.get('queryStringParameters') or {}
+    return query_string_parameters.get(param_name, default)
+
+
+def get_list_query_string_parameter(event: dict, param_name: str) -> list:
+    """
+    Retrieves a comma-separated query string parameter from the event object as a list of values.
+    The values are stripped and empty values are dropped (e.g., 'a, ,b,' returns ['a', 'b']).
+
+    Parameters:
+    -----------
+    event : dict
+        The event dictionary containing the query string parameters.
+    param_name : str
+        The name of the query string parameter to retrieve.
+
+    Returns:
+    --------
+    list
+        The non-empty values of the specified query string parameter, in order.
+
+    Raises:
+    -------
+    KeyError
+        If the query string parameter is missing from the event object.
+    """
+    return [value for value in (value.strip() for value in (get_query_string_parameter(event, param_name) or '').split(',')) if value]
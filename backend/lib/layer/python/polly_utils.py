@@ -9,14 +9,17 @@ and manage audio data. It includes functionality to:
 
 Imports:
 ---------
-- boto3: AWS SDK for Python to interact with AWS services.
 - os: Provides access to environment variables.
 - logging: Provides log levels and structured logging.
-- io: Provides Python's core tools for working with I/O streams.
+- functools.lru_cache: Used to keep the Polly voices and the upload client for the lifetime of the Lambda container.
 - constants: Defines constants used throughout the module (imported from Lambda layer).
+- client_utils: Custom utility functions for creating AWS service clients (imported from Lambda layer).
+- boto3: AWS SDK for Python, only imported to upload a synthesized audio to S3.
 
 Functions:
 -----------
+- get_supported_languages()
+- get_upload_client()
 - get_default_voice_for_language(polly, language_code)
 - split_text_into_chunks(text, max_length)
 - synthesize_speech(bucket_name, file_key, text, output_format, language_code)
@@ -25,11 +28,11 @@ Functions:
 - process_audio_stream_and_upload_to_s3(bucket, key, audio_stream)
 """
 
-import boto3
 import os
 import logging
-import io
+from functools import lru_cache
 import constants # from layer
+import client_utils # from layer
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -42,20 +45,49 @@ SYNTHESIZE_MAX_LENGTH = 3000
 ASYNC_SYNTHESIZE_MAX_LENGTH = 180000 
 
 REGION = os.environ[constants.REGION]
-polly = boto3.client('polly', region_name=REGION)
-s3 = boto3.client('s3', region_name=REGION)\
+polly = client_utils.get_client('polly', REGION)
 
+@lru_cache(maxsize=1)
+def get_supported_languages():
+    """
+    Returns the language codes supported by Amazon Polly.
+    The voices are listed once and kept for the lifetime of the Lambda container, errors are not cached.
+
+    Returns:
+    --------
+    frozenset
+        The supported language codes (e.g., 'en-US', 'fr-FR').
+    """
+    return frozenset(voice['LanguageCode'] for voice in polly.describe_voices()['Voices'])
+
+@lru_cache(maxsize=1)
+def get_upload_client():
+    """
+    Returns the boto3 S3 client used for the managed upload of the audio streams, with the same connection and retry
+    configuration as the other clients. botocore clients do not provide `upload_fileobj`, so boto3 is only imported
+    and the client created when the first audio is uploaded, not when the module is imported.
+
+    Returns:
+    --------
+    boto3.client
+        The boto3 S3 client.
+    """
+    import boto3
+    return boto3.client('s3', region_name=REGION, config=client_utils.CLIENT_CONFIG)
+
+@lru_cache(maxsize=64)
 def get_default_voice_for_language(polly, language_code):
     """
     Retrieves the default voice for a specified language using the AWS Polly service.
     
     The function queries AWS Polly to list available voices for the given language code and 
-    returns the first available voice as the default.
+    returns the first available voice as the default. The voice is kept for the lifetime of the Lambda
+    container, so the returned dictionary must not be modified.
 
     Parameters:
     -----------
-    polly : boto3.client
-        The boto3 Polly client used to interact with the AWS Polly service.
+    polly : botocore.client.BaseClient
+        The Polly client used to interact with the AWS Polly service.
     language_code : str
         The language code (e.g., 'en-US', 'fr-FR') for which the default voice should be retrieved.
 
@@ -110,13 +142,14 @@ def split_text_into_chunks(text, max_length):
         A list of text chunks.
     """
     chunks = []
-    while len(text) > max_length:
-        split_index = text[:max_length].rfind('.') + 1  # Try to split at the end of a sentence
+    start = 0 # Start of the next chunk, the text is only sliced once per chunk
+    while len(text) - start > max_length:
+        split_index = text.rfind('.', start, start + max_length) + 1  # Try to split at the end of a sentence
         if split_index == 0:  # If no period found, split at max_length
-            split_index = max_length
-        chunks.append(text[:split_index].strip())
-        text = text[split_index:]
-    chunks.append(text.strip())
+            split_index = start + max_length
+        chunks.append(text[start:split_index].strip())
+        start = split_index
+    chunks.append(text[start:].strip())
     return chunks
     
 def synthesize_speech(bucket_name, file_key, text, output_format, language_code, async_processing: bool):
@@ -146,11 +179,8 @@ def synthesize_speech(bucket_name, file_key, text, output_format, language_code,
         Exception: For any errors encountered during the synthesis or S3 upload process.
 
     """
-    # Check Polly's supported languages
-    polly_languages = polly.describe_voices()['Voices']
-    polly_supported_languages = {voice['LanguageCode'] for voice in polly_languages}
     # Check if the language code is supported by polly
-    if language_code in polly_supported_languages:
+    if language_code in get_supported_languages():
         try:
             voice = get_default_voice_for_language(polly, language_code)
             # Determine the maximum allowed length based on the engine
@@ -233,26 +263,22 @@ def extract_file_key_from_url(s3_url):
         str: The S3 file key extracted from the URL. For example:
              'resource/audios/2024-09-04/output.mp3'
     """
-    # Find the start of the S3 path by locating the first '/' after the domain
-    path_start = s3_url.find('/', s3_url.find('//') + 2)
-    
-    if path_start == -1:
+    # Split once on the scheme, domain and bucket name: ['https:', '', domain, bucket, file key]
+    parts = s3_url.split('/', 4)
+
+    if len(parts) < 4:
         raise ValueError("Invalid S3 URL: No path found in the URL.")
-    
-    # Remove the bucket name from the path
-    parts = s3_url[path_start + 1:].split('/', 1)  # Split once to remove the bucket name
-    if len(parts) < 2:
+
+    if len(parts) < 5:
         raise ValueError("Invalid S3 URL: Could not find the file key.")
-    
-    file_key = parts[1]
-    
-    return file_key
+
+    return parts[4]
 
 
 def process_audio_stream_and_upload_to_s3(bucket, file_key, audio_stream):
     """
-    Processes an audio stream in chunks, accumulates the data in memory, 
-    and uploads the full file to an S3 bucket once the entire stream has been processed.
+    Uploads an audio stream to an S3 bucket without accumulating the full audio in memory.
+    The stream is read by the S3 transfer manager, which uploads it in parts when it is large.
 
     Args:
         bucket (str): The name of the S3 bucket where the audio file will be uploaded.
@@ -266,18 +292,4 @@ def process_audio_stream_and_upload_to_s3(bucket, file_key, audio_stream):
         ValueError: If there is an issue reading the audio stream.
         Exception: If the S3 upload fails for any reason.
     """
-    # Define a chunk size 
-    chunk_size = 100 * 1024  # 100 KB per chunk
-    full_data = io.BytesIO()  # In-memory buffer to accumulate the data
-    
-    # Read and process the stream in chunks
-    chunk = audio_stream.read(chunk_size)  # First read to check if there's data
-    while chunk:
-        full_data.write(chunk)  # Accumulate the chunk in memory
-        
-        # Read the next chunk
-        chunk = audio_stream.read(chunk_size)
-
-    # After all chunks are read, upload the full file to S3
-    full_data.seek(0)  # Rewind the buffer to the beginning before uploading
-    s3.put_object(Bucket=bucket, Key=file_key, Body=full_data.getvalue())
\ No newline at end of file
+    get_upload_client().upload_fileobj(audio_stream, bucket, file_key)
@@ -9,31 +9,81 @@ Functions:
 1. format_response(code, body):
    Formats the HTTP response with a given status code and body content.
 
-2. get_response_formatting_size():
+2. format_serialized_response(code, body_json):
+   Formats the HTTP response with a given status code and a body already serialized to JSON.
+
+3. get_response_formatting_size():
    Calculates the size of the formatted response in bytes.
 
-3. format_exception(exception):
+4. format_exception(exception):
    Formats an exception into an HTTP response with an error message.
 
-4. send_response_with_file_key(value, file_key):
+5. send_response_with_file_key(value, file_key):
    Sends an HTTP response containing a file key and optionally a value, depending on response size.
 
-5. send_response_with_file_key_and_audio_key(value, file_key, audio_key):
+6. send_response_with_file_key_and_audio_key(value, file_key, audio_key):
    Sends an HTTP response containing a file key, an audio file key, and optionally a value, depending on response size.
 
-6. send_response_with_file_key_and_task_id(value, file_key, task_id):
+7. send_response_with_file_key_and_task_id(value, file_key, task_id):
    Sends an HTTP response containing a file key, a task id for the s3 polly synthesis job, and optionally a value, depending on response size.
+
+8. format_conditional_response(event, code, body):
+   Formats the HTTP response with an ETag header, or a 304 Not Modified response if the client already has the same body.
+
+9. send_response_with_value(value, body):
+   Sends an HTTP response containing the given keys and the value, if the response size allows it.
+
+10. serialize_body(body):
+   Serializes a response body to JSON and returns it with its size in bytes.
+
+11. get_exception_details(exception):
+   Returns the status code, status and error message of an exception.
 """
 
 import logging
 import json
-import sys
+try:
+    import orjson # bundled by the functions that list it in their requirements
+except ImportError:
+    orjson = None
+import hashlib
 import constants
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 MAX_RESPONSE_SIZE = 5 * 1024 * 1024  # 5 MB
+NOT_MODIFIED_CODE = 304
+
+# (code, status) of the error responses, by exception type and by AWS error code.
+# Exception subclasses use the response of the closest registered type.
+EXCEPTION_TYPE_RESPONSES = {
+    KeyError: (constants.BAD_REQUEST_CODE, constants.BAD_REQUEST_STATUS),
+    ValueError: (constants.UNPROCESSABLE_CONTENT_CODE, constants.UNPROCESSABLE_CONTENT_STATUS),
+}
+AWS_ERROR_CODE_RESPONSES = {
+    'AccessDeniedException': (constants.ACCESS_DENIED_CODE, constants.ACCESS_DENIED_STATUS),
+    'ConflictException': (constants.CONFLICT_ERROR_CODE, constants.CONFLICT_ERROR_STATUS),
+    'NoSuchKey': (constants.NOT_FOUND_CODE, constants.NOT_FOUND_STATUS),
+    'ResourceNotFoundException': (constants.NOT_FOUND_CODE, constants.NOT_FOUND_STATUS),
+    'ValidationException': (constants.UNPROCESSABLE_CONTENT_CODE, constants.UNPROCESSABLE_CONTENT_STATUS),
+}
+
+# Headers of every response. The dict is shared by the responses and must not be modified,
+# responses with extra headers use a copy
+CORS_HEADERS = {
+    'Access-Control-Allow-Headers': '*',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': '*',
+    'Access-Control-Allow-Credentials': 'true',
+}
+
+# Size in bytes of a serialized response with an empty body, added to the body size to check the response size
+RESPONSE_FORMATTING_SIZE = len(json.dumps({
+    'statusCode': 'XXX',
+    'headers': CORS_HEADERS,
+    'body': ''
+}))
 
 def format_response(code, body):
     """
@@ -51,38 +101,99 @@ def format_response(code, body):
     dict
         A dictionary representing the formatted HTTP response, including status code, headers, and body.
     """
-    data = {
+    body_json, _ = serialize_body(body)
+    return format_serialized_response(code, body_json)
+
+def serialize_body(body):
+    """
+    Serializes a response body to JSON and returns it with its size in bytes.
+    Uses orjson when the Lambda function bundles it, json otherwise. Both produce the same compact,
+    UTF-8 output, so the response bytes do not depend on the requirements of the function.
+
+    Parameters:
+    -----------
+    body : dict
+        The content to serialize, typically a dictionary.
+
+    Returns:
+    --------
+    tuple
+        The JSON string and its size in bytes once encoded to UTF-8.
+    """
+    if orjson is not None:
+        body_bytes = orjson.dumps(body)
+        return body_bytes.decode(), len(body_bytes)
+    body_json = json.dumps(body, ensure_ascii=False, separators=(',', ':'))
+    return body_json, len(body_json.encode())
+
+def format_serialized_response(code, body_json):
+    """
+    Formats the HTTP response with the given status code and a body already serialized to JSON.
+
+    Parameters:
+    -----------
+    code : int
+        The HTTP status code to include in the response.
+    body_json : str
+        The JSON content to include in the response body.
+
+    Returns:
+    --------
+    dict
+        A dictionary representing the formatted HTTP response, including status code, headers, and body.
+    """
+    return {
         'statusCode': code,
-        'headers': {
-            'Access-Control-Allow-Headers': '*',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': '*',
-            'Access-Control-Allow-Credentials': 'true',
-        },
-        'body': json.dumps(body)
+        'headers': CORS_HEADERS,
+        'body': body_json
     }
-    return data
+
+def format_conditional_response(event, code, body):
+    """
+    Formats the HTTP response with an ETag header computed from the body content.
+    If the request If-None-Match header matches the ETag, a 304 Not Modified response without body is returned instead.
+    Used by polling endpoints, where most responses are the same as the previous one.
+
+    Parameters:
+    -----------
+    event : dict
+        The event object containing the request headers.
+    code : int
+        The HTTP status code to include in the response.
+    body : dict
+        The content to include in the response body, typically a dictionary.
+
+    Returns:
+    --------
+    dict
+        A dictionary representing the formatted HTTP response, including status code, headers, and body if it changed.
+    """
+    response = format_response(code=code, body=body)
+    etag = f'"{hashlib.blake2b(response["body"].encode(), digest_size=16).hexdigest()}"'
+    headers = {**response['headers'], 'ETag': etag, 'Access-Control-Expose-Headers': 'ETag'}
+
+    request_headers = event.get('headers') or {}
+    if_none_match = next((value for name, value in request_headers.items() if name.lower() == 'if-none-match'), None)
+    if if_none_match == etag:
+        return {
+            'statusCode': NOT_MODIFIED_CODE,
+            'headers': headers
+        }
+
+    response['headers'] = headers
+    return response
 
 def get_response_formatting_size():
     """
     Calculates the size of the formatted response in bytes.
+    The size is measured once, on the JSON serialization of a response with an empty body.
 
     Returns:
     --------
     int
         The size of the formatted response in bytes.
     """
-    data = {
-        'statusCode': 'XXX',
-        'headers': {
-            'Access-Control-Allow-Headers': '*',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': '*',
-            'Access-Control-Allow-Credentials': 'true',
-        },
-        'body': {}
-    }
-    return sys.getsizeof(data)
+    return RESPONSE_FORMATTING_SIZE
 
 def format_exception(exception):
     """
@@ -98,43 +209,73 @@ def format_exception(exception):
     dict
         A dictionary representing the formatted error response, including status code, headers, and body.
     """
+    code, status, message = get_exception_details(exception)
+    return format_response(code=code, body={
+        'code': code,
+        'status': status,
+        'message': message
+    })
+
+def get_exception_details(exception):
+    """
+    Returns the status code, status and error message of an exception, as used in error responses.
+    Also used for the items of batch requests, which report their errors in the item instead of failing the request.
+
+    Parameters:
+    -----------
+    exception : Exception
+        The exception to describe.
+
+    Returns:
+    --------
+    tuple
+        The HTTP status code, the status and the error message of the exception.
+    """
     logger.error("An error occurred: %s", str(exception))
     
     code = constants.INTERNAL_SERVER_ERROR_CODE
     status = constants.INTERNAL_SERVER_ERROR_STATUS
     message = 'Internal Server Error.'
-    if type(exception) == KeyError:
-        code = constants.BAD_REQUEST_CODE
-        status = constants.BAD_REQUEST_STATUS
-        message = str(exception)
-    elif type(exception) == ValueError:
-        code = constants.UNPROCESSABLE_CONTENT_CODE
-        status = constants.UNPROCESSABLE_CONTENT_STATUS
+    exception_type = next((cls for cls in type(exception).__mro__ if cls in EXCEPTION_TYPE_RESPONSES), None)
+    if exception_type is not None:
+        code, status = EXCEPTION_TYPE_RESPONSES[exception_type]
         message = str(exception)
     elif hasattr(exception, 'response') and 'Error' in exception.response:
         response = exception.response
         error = response['Error']
         if 'Code' in error and 'Message' in error:
             message = error['Message']
-            if error['Code'] == 'AccessDeniedException':
-                code = constants.ACCESS_DENIED_CODE
-                status = constants.ACCESS_DENIED_STATUS
-            elif error['Code'] == 'ConflictException':
-                code = constants.CONFLICT_ERROR_CODE
-                status = constants.CONFLICT_ERROR_STATUS
-            elif error['Code'] == 'NoSuchKey' or error['Code'] == 'ResourceNotFoundException':
-                code = constants.NOT_FOUND_CODE
-                status = constants.NOT_FOUND_STATUS
-            elif error['Code'] == 'ValidationException':
-                code = constants.UNPROCESSABLE_CONTENT_CODE
-                status = constants.UNPROCESSABLE_CONTENT_STATUS
+            if error['Code'] in AWS_ERROR_CODE_RESPONSES:
+                code, status = AWS_ERROR_CODE_RESPONSES[error['Code']]
             elif error['Code'].isnumeric():
                 code = error['Code']
-    return format_response(code=code, body={
-        'code': code,
-        'status': status,
-        'message': message
-    })
+    return code, status, message
+
+def send_response_with_value(value, body):
+    """
+    Sends an HTTP response containing the given keys and the value, if the response size allows it.
+    The body is serialized once, the value is dropped from the response when the serialized response
+    is bigger than the allowed size.
+
+    Parameters:
+    -----------
+    value : any
+        The value to include in the response, if applicable.
+    body : dict
+        The other keys to include in the response (e.g., the file key).
+
+    Returns:
+    --------
+    dict
+        A dictionary representing the formatted HTTP response, potentially including the value.
+    """
+    body_json, body_size = serialize_body({**body, "value": value})
+
+    # If its bigger than the allowed size send only the keys
+    if get_response_formatting_size() + body_size >= MAX_RESPONSE_SIZE:
+        return format_response(code=200, body=body)
+    else:
+        return format_serialized_response(code=200, body_json=body_json)
 
 def send_response_with_file_key(value, file_key):
     """
@@ -152,16 +293,7 @@ def send_response_with_file_key(value, file_key):
     dict
         A dictionary representing the formatted HTTP response, potentially including both file key and value.
     """
-    # Get the size of the response in bytes
-    response_size = get_response_formatting_size() + sys.getsizeof({
-        'body': json.dumps({"fileKey": file_key, "value": value})
-    })
-
-    # If its bigger than the allowed size send only file key
-    if response_size >= MAX_RESPONSE_SIZE:
-        return format_response(code=200, body={"fileKey": file_key})
-    else:
-        return format_response(code=200, body={"fileKey": file_key, "value": value})
+    return send_response_with_value(value, {"fileKey": file_key})
 
 def send_response_with_file_key_and_audio_key(value, file_key, audio_key):
     """
@@ -181,16 +313,7 @@ def send_response_with_file_key_and_audio_key(value, file_key, audio_key):
     dict
         A dictionary representing the formatted HTTP response, potentially including file key, audio key, and value.
     """
-    # Get the size of the response in bytes
-    response_size = get_response_formatting_size() + sys.getsizeof({
-        'body': json.dumps({"fileKey": file_key, "audioFileKey": audio_key, "value": value})
-    })
-
-    # If its bigger than the allowed size send only file key
-    if response_size >= MAX_RESPONSE_SIZE:
-        return format_response(code=200, body={"fileKey": file_key, "audioFileKey": audio_key})
-    else:
-        return format_response(code=200, body={"fileKey": file_key, "audioFileKey": audio_key, "value": value})
+    return send_response_with_value(value, {"fileKey": file_key, "audioFileKey": audio_key})
 
 def send_response_speech_synthesis(value, file_key, task_id):
     """
@@ -210,14 +333,4 @@ def send_response_speech_synthesis(value, file_key, task_id):
     dict
         A dictionary representing the formatted HTTP response, potentially including file key, audio key, and value.
     """
-    # Get the size of the response in bytes
-    response_size = get_response_formatting_size() + sys.getsizeof({
-        'body': json.dumps({"fileKey": file_key, "taskId": task_id, "value": value})
-    })
-
-    # If its bigger than the allowed size send only file key
-    if response_size >= MAX_RESPONSE_SIZE:
-        return format_response(code=200, body={"fileKey": file_key, "taskId": task_id})
-    else:
-        return format_response(code=200, body={"fileKey": file_key,  "taskId": task_id, "value": value})
-
+    return send_response_with_value(value, {"fileKey": file_key, "taskId": task_id})
@@ -3,7 +3,8 @@ s3_cache_utils.py
 
 This module provides utility functions for caching and retrieving responses from Amazon S3. 
 It helps optimize API calls (e.g., to Bedrock) by checking for existing responses in S3 before 
-making a new request.
+making a new request. Responses read or written by s3_utils are also kept in its in-memory JSON cache,
+so repeated requests on a warm Lambda container skip the S3 lookup for a few minutes.
 
 Functions:
 ----------
@@ -20,7 +21,6 @@ Functions:
    which saves the response in S3, and returns the result.
 """
 import s3_utils
-import polly_utils
 import logging
 
 logger = logging.getLogger()
@@ -28,8 +28,8 @@ logger.setLevel(logging.INFO)
 
 def get_or_generate_bedrock_response(bucket_name: str, file_key: str, call_bedrock_function, *args, **kwargs):
     """
-    Check if the response exists in S3 before calling Bedrock.
-    If the response exists, return it from S3. Otherwise, generate it using Bedrock, save it, and return it.
+    Check if the response exists in memory or in S3 before calling Bedrock.
+    If the response exists, return it from memory or S3. Otherwise, generate it using Bedrock, save it, and return it.
     This function was introduced to handle Gateway Timeouts from API Gateway -  Lambda integration.
 
     Parameters:
@@ -41,12 +41,14 @@ def get_or_generate_bedrock_response(bucket_name: str, file_key: str, call_bedro
     - dict: The final response.
     """
     try:
-        file_exists = s3_utils.check_s3_file_exists(bucket_name, file_key)
-        if file_exists:
-            bedrock_response = s3_utils.get_json_from_s3(bucket_name, file_key)
-        else: 
+        # A single GET checks that the response exists in S3 and fetches it
+        bedrock_response = s3_utils.try_get_json_from_s3(bucket_name, file_key)
+        file_exists = bedrock_response is not None
+        if not file_exists:
             bedrock_response = call_bedrock_function(*args, **kwargs)
-            s3_utils.write_json_to_s3(bucket_name, file_key, bedrock_response)
+            # A concurrent request may have stored the response first, it is then used so that both requests return the same one
+            if s3_utils.write_json_to_s3(bucket_name, file_key, bedrock_response, if_not_exists=True) is None:
+                bedrock_response = s3_utils.get_json_from_s3(bucket_name, file_key)
         return bedrock_response, file_exists
     except Exception as e:
         logger.debug("An error occurred: %s", str(e))
@@ -74,6 +76,8 @@ def get_or_synthesize_speech(bucket_name: str, file_key: str, text_to_synthesize
         if file_exists:
             synthesis_result = {'audio_key': file_key}
         else: 
+            # Only needed to synthesize a new audio, imported here so the Lambda functions don't load it (and boto3) on cold starts
+            import polly_utils # from layer
             synthesis_result = polly_utils.synthesize_speech(bucket_name, file_key, text_to_synthesize, output_format, language_code, async_processing=async_processing)
         return synthesis_result
     except Exception as e:
@@ -82,8 +86,8 @@ def get_or_synthesize_speech(bucket_name: str, file_key: str, text_to_synthesize
     
 def get_or_generate_translation(bucket_name: str, file_key: str, call_translation_function, text_to_translate: str, source_language_code: str, destination_language_code: str):
     """
-    Check if the response exists in S3 before calling Translate.
-    If the response exists, return it from S3. Otherwise, generate it using Translate, save it, and return it.
+    Check if the response exists in memory or in S3 before calling Translate.
+    If the response exists, return it from memory or S3. Otherwise, generate it using Translate, save it, and return it.
     This function was introduced to handle Gateway Timeouts from API Gateway -  Lambda integration.
 
     Parameters:
@@ -98,12 +102,14 @@ def get_or_generate_translation(bucket_name: str, file_key: str, call_translatio
     - dict: The final response.
     """
     try:
-        file_exists = s3_utils.check_s3_file_exists(bucket_name, file_key)
-        if file_exists:
-            translation_response = s3_utils.get_json_from_s3(bucket_name, file_key)
-        else: 
+        # A single GET checks that the response exists in S3 and fetches it
+        translation_response = s3_utils.try_get_json_from_s3(bucket_name, file_key)
+        file_exists = translation_response is not None
+        if not file_exists:
             translation_response = call_translation_function(text_to_translate, source_language_code, destination_language_code)
-            s3_utils.write_json_to_s3(bucket_name, file_key, translation_response)
+            # A concurrent request may have stored the response first, it is then used so that both requests return the same one
+            if s3_utils.write_json_to_s3(bucket_name, file_key, translation_response, if_not_exists=True) is None:
+                translation_response = s3_utils.get_json_from_s3(bucket_name, file_key)
         return translation_response, file_exists
     except Exception as e:
         logger.debug("An error occurred: %s", str(e))
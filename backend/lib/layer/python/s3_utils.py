@@ -9,10 +9,10 @@ Functions:
 1. get_json_from_s3(s3_bucket, file_key):
    Fetches a JSON file from the specified S3 bucket and returns its content.
 
-2. write_json_to_s3(bucket_name, file_key, json_data_to_write):
+2. write_json_to_s3(bucket_name, file_key, json_data_to_write, if_not_exists=False):
    Writes a JSON object to an S3 bucket under a specified key.
 
-3. move_s3_object(source_bucket, source_key, destination_bucket, destination_key):
+3. move_s3_object(source_bucket, source_key, destination_bucket, destination_key, known_keys=None):
    Moves an object from one S3 bucket/key to another by copying and then deleting the original object.
 
 4. get_file_key(transcription_job_name, folder_path, identity_id, output_format='json', language=None, model_id=None, timestamp=None ):
@@ -22,23 +22,90 @@ Functions:
 5. get_transcription(transcription_job_name, s3_bucket, identity_id):
    Fetches the transcription text from an S3 bucket based on the transcription job name and identity ID.
 
-6. check_s3_file_exists(bucket_name, file_key):
-   Checks if a file exists in an S3 bucket by attempting to retrieve the file's metadata.
+6. check_s3_file_exists(bucket_name, file_key, known_keys=None):
+   Checks if a file exists in an S3 bucket by attempting to retrieve the file's metadata, or in a set of keys already listed.
+
+7. try_get_json_from_s3(s3_bucket, file_key):
+   Fetches a JSON file from the specified S3 bucket, or returns None if it does not exist.
+
+8. list_keys_with_prefix(bucket_name, prefix):
+   Lists the keys of the files under a prefix, to check if several files exist with a single request.
+
+9. copy_s3_object(source_bucket, source_key, destination_bucket, destination_key, known_keys=None):
+   Copies an object to its destination as the first step of a move.
+
+10. move_s3_objects(source_bucket, destination_bucket, key_pairs, known_keys=None):
+   Moves several objects concurrently, deleting the original objects with a single request.
+
+11. delete_s3_objects(bucket_name, file_keys):
+   Deletes several objects of an S3 bucket with one request per 1000 keys.
+
+12. cache_json(s3_bucket, file_key, json_content):
+   Keeps the content of a JSON file in memory, evicting the least recently used entry when the cache is full.
 """
 
-import boto3
 import os
 import logging
 import json
+import gzip
+try:
+    import orjson # bundled by the functions that list it in their requirements
+except ImportError:
+    orjson = None
 import constants # from layer
-from datetime import datetime
+import client_utils # from layer
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+import time
+import threading
+from cachetools import LRUCache, TTLCache
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Initialize the S3 client
 REGION = os.environ[constants.REGION]
-s3 = boto3.client('s3', region_name=REGION)
+s3 = client_utils.get_client('s3', REGION)
+
+# Parse the JSON files read from S3 and serialize the files written to S3, bound once at import.
+# Both parsers accept the UTF-8 bytes of the file, both serializers write compact UTF-8 bytes.
+if orjson is not None:
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+else:
+    json_loads = json.loads
+    def json_dumps(data):
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+# Runs the copies of the objects moved together
+move_executor = ThreadPoolExecutor(max_workers=10)
+DELETE_OBJECTS_MAX_KEYS = 1000
+
+# Transcriptions already downloaded by this container, keyed by S3 file key: {file_key: (etag, transcript)}.
+# Kept small as transcriptions of long videos can take several MB. Entries are checked against the ETag of the file
+# so they need no TTL. The caches are used from the executor threads of the handlers, every access holds the lock.
+TRANSCRIPTION_CACHE_MAX_SIZE = 16
+transcription_cache = LRUCache(maxsize=TRANSCRIPTION_CACHE_MAX_SIZE)
+transcription_cache_lock = threading.Lock()
+
+# JSON files already read or written by this container, keyed by (bucket, file key): {(bucket, file_key): content}.
+# This is the only in-memory cache of the JSON files (including the generated responses of s3_cache_utils), entries
+# copied by this container are invalidated and the TTL bounds how long changes made by other containers are missed.
+JSON_CACHE_MAX_SIZE = int(os.environ.get(constants.JSON_CACHE_MAX_SIZE, 256))
+JSON_CACHE_TTL = int(os.environ.get(constants.JSON_CACHE_TTL, 300)) # seconds
+json_cache = TTLCache(maxsize=JSON_CACHE_MAX_SIZE, ttl=JSON_CACHE_TTL)
+json_cache_lock = threading.Lock()
+
+# JSON files bigger than this size in bytes are stored gzip compressed, with the gzip Content-Encoding.
+# Browsers decompress them transparently when the frontend downloads them, get_json_from_s3 decompresses them.
+COMPRESSION_MIN_SIZE = 4 * 1024
+COMPRESSION_LEVEL = 5
+
+# Error codes returned by S3 when a conditional write finds an existing object, or a concurrent write of the same object
+EXISTING_OBJECT_ERROR_CODES = ('PreconditionFailed', 'ConditionalRequestConflict')
+
+# Error codes returned by S3 when the requested object does not exist
+MISSING_OBJECT_ERROR_CODES = ('NoSuchKey', '404', 'NotFound')
 
 def get_json_from_s3(s3_bucket: str, file_key: str) -> dict:
     """
@@ -71,25 +138,66 @@ def get_json_from_s3(s3_bucket: str, file_key: str) -> dict:
         Raised if the content of the fetched file cannot be parsed as JSON. This may occur if the file content is not in valid JSON format or if there is an issue with the encoding.
 
     JSONDecodeError
-        Raised if the `json.loads` function encounters an error while decoding the JSON content. This could be due to corrupted data or unexpected characters in the file content.
+        Raised if the JSON parser encounters an error while decoding the JSON content. This could be due to corrupted data or unexpected characters in the file content.
 
     Notes:
     -------
-    - The function first performs a `head_object` call to check if the object exists and to validate the key. This is a preliminary check to avoid fetching the object if it does not exist.
-    - After confirming the object exists, it retrieves the object using the `get_object` call and attempts to decode its content from UTF-8 to a JSON dictionary.
+    - The function retrieves the object with a single `get_object` call, which raises `NoSuchKey` if it does not exist,
+      and attempts to decode its content from UTF-8 to a JSON dictionary.
+    - The content is kept in memory for `JSON_CACHE_TTL` seconds, later calls for the same file return it without a request.
     - Any errors encountered during these operations will be caught and printed, and then re-raised for further handling.
     """
+    cache_key = (s3_bucket, file_key)
+    with json_cache_lock:
+        cached = json_cache.get(cache_key)
+    if cached is not None:
+        return cached
     try:
-        s3.head_object(Bucket=s3_bucket, Key=file_key)
         response = s3.get_object(Bucket=s3_bucket, Key=file_key)
-        json_content = json.loads(response['Body'].read().decode('utf-8'))
+        body = response['Body'].read()
+        if response.get('ContentEncoding') == 'gzip':
+            body = gzip.decompress(body)
+        json_content = json_loads(body)
+        cache_json(s3_bucket, file_key, json_content)
         return json_content
     except Exception as e:
-        logger.debug("Error getting json file from S3: %s", str(e))
+        logger.debug("Error getting json file from S3: %s", e)
+        raise e
+
+
+def try_get_json_from_s3(s3_bucket: str, file_key: str):
+    """
+    Fetches a JSON file from the specified S3 bucket, or returns None if it does not exist.
+    A single `get_object` call both checks that the file exists and fetches it.
+
+    Parameters:
+    -----------
+    s3_bucket : str
+        The name of the S3 bucket from which to fetch the file.
+    file_key : str
+        The key (path) of the file within the S3 bucket.
+
+    Returns:
+    --------
+    dict or None
+        The JSON content of the file, or None if the file does not exist.
+
+    Raises:
+    -------
+    botocore.exceptions.ClientError
+        For errors related to S3 operations other than the file not existing, such as `AccessDenied`.
+    ValueError
+        Raised if the content of the fetched file cannot be parsed as JSON.
+    """
+    try:
+        return get_json_from_s3(s3_bucket, file_key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in MISSING_OBJECT_ERROR_CODES:
+            return None
         raise e
 
 
-def write_json_to_s3(bucket_name : str, file_key : str, json_data_to_write):
+def write_json_to_s3(bucket_name : str, file_key : str, json_data_to_write, if_not_exists: bool = False):
     """
     Writes a JSON object to an S3 bucket under a specified key.
 
@@ -101,11 +209,14 @@ def write_json_to_s3(bucket_name : str, file_key : str, json_data_to_write):
         The key (path) under which the JSON data will be stored.
     json_data_to_write : dict
         The JSON data to be written to the S3 bucket.
+    if_not_exists : bool, optional
+        Whether to only write the file if no file exists under the key yet (default is False). S3 checks it atomically
+        with a conditional write, so concurrent writers of the same key keep the first file written.
 
     Returns:
     --------
-    str
-        The S3 key under which the JSON data was stored.
+    str or None
+        The S3 key under which the JSON data was stored, or None if `if_not_exists` is True and a file already existed.
 
     Raises:
     -------
@@ -119,24 +230,36 @@ def write_json_to_s3(bucket_name : str, file_key : str, json_data_to_write):
             - `InvalidObjectState`: If the object is in an invalid state for the requested operation.
             - `ServiceUnavailable`: If the S3 service is temporarily unavailable.
             - `QuotaExceeded`: If the storage quota for the bucket has been exceeded.
-    boto3.exceptions.S3UploadFailedError
-        If the upload to S3 fails for reasons not specifically covered by `ClientError`.
     """
-    json_string = json.dumps(json_data_to_write, indent=2)
+    # The files are only parsed by the application, they are written compact and in UTF-8 to keep them small
+    json_bytes = json_dumps(json_data_to_write)
+    extra_args = {'IfNoneMatch': '*'} if if_not_exists else {}
+    if len(json_bytes) > COMPRESSION_MIN_SIZE:
+        json_bytes = gzip.compress(json_bytes, compresslevel=COMPRESSION_LEVEL)
+        extra_args['ContentEncoding'] = 'gzip'
     try:
         s3.put_object(
             Bucket=bucket_name,
             Key=file_key,
-            Body=json_string.encode('utf-8'),  # Encode JSON data to bytes
-            ContentType='application/json'
+            Body=json_bytes,
+            ContentType='application/json',
+            **extra_args
         )
+        # The written content is what a later read returns, it is cached instead of read again
+        cache_json(bucket_name, file_key, json_data_to_write)
         return file_key
+    except ClientError as e:
+        if if_not_exists and e.response['Error']['Code'] in EXISTING_OBJECT_ERROR_CODES:
+            logger.debug("File already exists in S3 bucket, it was not written: %s", file_key)
+            return None
+        logger.debug("Error writing json file to S3: %s", e)
+        raise e
     except Exception as e:
-        logger.debug("Error writing json file to S3: %s", str(e))
+        logger.debug("Error writing json file to S3: %s", e)
         raise e
 
 def move_s3_object(source_bucket: str, source_key: str, 
-                   destination_bucket: str, destination_key: str):
+                   destination_bucket: str, destination_key: str, known_keys: set = None):
     """
     Moves an object from one S3 bucket to another by copying it to the destination bucket and then deleting the original object.
 
@@ -150,6 +273,8 @@ def move_s3_object(source_bucket: str, source_key: str,
         The name of the S3 bucket where the object will be copied to.
     destination_key : str
         The key (path) under which the object will be stored in the destination bucket.
+    known_keys : set, optional
+        The keys listed under the destination prefix, used to check if the destination exists without a request.
 
     Returns:
     --------
@@ -162,33 +287,127 @@ def move_s3_object(source_bucket: str, source_key: str,
             - `NoSuchBucket`: If the source or destination bucket does not exist.
             - `AccessDenied`: If the credentials used do not have permission to access or modify the source or destination bucket.
             - `InvalidBucketName`: If the bucket name is invalid.
-            - `NoSuchKey`: If the source key does not exist in the source bucket.
+            - `NoSuchKey`: If the source key does not exist in the source bucket and the object was not moved already.
             - `InvalidObjectState`: If the object is in an invalid state for the requested operation.
             - `ServiceUnavailable`: If the S3 service is temporarily unavailable.
-    boto3.exceptions.S3UploadFailedError
-        If the copy operation fails, such as due to network issues or internal failures during the copy process.
     Exception
-        For other unexpected errors that might occur during the operation, including errors not specifically related to S3 or boto3.
+        For other unexpected errors that might occur during the operation, including errors not specifically related to S3.
 
     Notes:
     -------
-    - The function first copies the object from the source bucket to the destination bucket using the `copy` method of the S3 client.
-    - After a successful copy, it deletes the original object from the source bucket using the `delete_object` method.
+    - The function copies the object from the source bucket to the destination bucket with a single `copy_object` call,
+      without checking first if the destination exists, as it usually does not.
+    - If the source object does not exist, the object was already moved by a previous call: the function only checks that the
+      destination exists, and raises the copy error otherwise.
+    - After a successful copy, or if the destination is in `known_keys`, it deletes the original object from the source bucket
+      using the `delete_object` method before returning. A Lambda function is frozen once it responds, so the delete is not
+      left to a background thread.
+    """
+    if copy_s3_object(source_bucket, source_key, destination_bucket, destination_key, known_keys):
+        s3.delete_object(Bucket=source_bucket, Key=source_key)
+
+def copy_s3_object(source_bucket: str, source_key: str,
+                   destination_bucket: str, destination_key: str, known_keys: set = None) -> bool:
     """
-    if check_s3_file_exists(destination_bucket, destination_key):
+    Copies an object to its destination as the first step of a move, see `move_s3_object`.
+
+    Parameters:
+    -----------
+    source_bucket : str
+        The name of the S3 bucket where the original object is located.
+    source_key : str
+        The key (path) of the object in the source bucket.
+    destination_bucket : str
+        The name of the S3 bucket where the object will be copied to.
+    destination_key : str
+        The key (path) under which the object will be stored in the destination bucket.
+    known_keys : set, optional
+        The keys listed under the destination prefix, used to check if the destination exists without a request.
+
+    Returns:
+    --------
+    bool
+        True if the source object must be deleted, False if the object was already moved and the source no longer exists.
+
+    Raises:
+    -------
+    botocore.exceptions.ClientError
+        For the S3 errors of the copy, see `move_s3_object`.
+    """
+    if known_keys is not None and destination_key in known_keys:
+        # The source may remain if the delete of a previous move failed, deleting a missing key succeeds
         logger.debug("File already exists in destination S3 bucket. Continuing with this file.")
-    else:
-        try:
-            # Copy the object from the source bucket to the destination bucket
-            copy_source = {'Bucket': source_bucket, 'Key': source_key}
-            s3.copy(copy_source, destination_bucket, destination_key)
+        return True
+    try:
+        # Copy the object from the source bucket to the destination bucket
+        copy_source = {'Bucket': source_bucket, 'Key': source_key}
+        # The moved files are JSON transcriptions, far below the 5 GB limit of a single CopyObject request
+        s3.copy_object(CopySource=copy_source, Bucket=destination_bucket, Key=destination_key)
+        with json_cache_lock:
+            json_cache.pop((destination_bucket, destination_key), None)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] in MISSING_OBJECT_ERROR_CODES and check_s3_file_exists(destination_bucket, destination_key):
+            logger.debug("File already exists in destination S3 bucket. Continuing with this file.")
+            return False
+        logger.debug("Error moving json file to and from S3: %s", e)
+        raise e
+    except Exception as e:
+        logger.debug("Error moving json file to and from S3: %s", e)
+        raise e
+
+def move_s3_objects(source_bucket: str, destination_bucket: str, key_pairs: list, known_keys: set = None):
+    """
+    Moves several objects from one S3 bucket to another. The objects are copied concurrently, then the
+    original objects are deleted before returning with a single `delete_objects` call per 1000 keys.
+
+    Parameters:
+    -----------
+    source_bucket : str
+        The name of the S3 bucket where the original objects are located.
+    destination_bucket : str
+        The name of the S3 bucket where the objects will be copied to.
+    key_pairs : list
+        The (source key, destination key) pairs of the objects to move.
+    known_keys : set, optional
+        The keys listed under the destination prefix, used to check if the destinations exist without a request.
 
-            # Delete the original object from the source bucket
-            s3.delete_object(Bucket=source_bucket, Key=source_key)
-            
-        except Exception as e:
-            logger.debug("Error moving json file to and from S3: %s", str(e))
-            raise e
+    Returns:
+    --------
+    None
+
+    Raises:
+    -------
+    botocore.exceptions.ClientError
+        For the S3 errors of the copies, see `move_s3_object`. The original objects are not deleted if a copy fails.
+    """
+    copied = list(move_executor.map(
+        lambda key_pair: copy_s3_object(source_bucket, key_pair[0], destination_bucket, key_pair[1], known_keys=known_keys),
+        key_pairs
+    ))
+    source_keys = [source_key for (source_key, _), was_copied in zip(key_pairs, copied) if was_copied]
+    if source_keys:
+        delete_s3_objects(source_bucket, source_keys)
+
+def delete_s3_objects(bucket_name: str, file_keys: list):
+    """
+    Deletes several objects of an S3 bucket, with one `delete_objects` call per 1000 keys.
+    The keys that could not be deleted are only logged.
+
+    Parameters:
+    -----------
+    bucket_name : str
+        The name of the S3 bucket where the objects are stored.
+    file_keys : list
+        The keys of the objects to delete.
+    """
+    for start in range(0, len(file_keys), DELETE_OBJECTS_MAX_KEYS):
+        response = s3.delete_objects(Bucket=bucket_name, Delete={
+            'Objects': [{'Key': file_key} for file_key in file_keys[start:start + DELETE_OBJECTS_MAX_KEYS]],
+            'Quiet': True
+        })
+        for error in response.get('Errors', []):
+            logger.warning("Error deleting S3 object %s: %s", error.get('Key'), error.get('Message'))
 
 def get_file_key(transcription_job_name: str, folder_path: str, identity_id: str, 
                  output_format: str = 'json', model_id = None, language = None, timestamp = None) -> str:
@@ -232,8 +451,7 @@ def get_file_key(transcription_job_name: str, folder_path: str, identity_id: str
         if timestamp is None:
             return f'{identity_id}/{folder_path}{transcription_job_name}-{model_id}-{language}.{output_format}'
         else:
-            dt = datetime.now()
-            ts = datetime.timestamp(dt)
+            ts = time.time()
             return f'{identity_id}/{folder_path}{transcription_job_name}-{model_id}-{ts}-{language}.{output_format}'
     elif language:
         return f'{identity_id}/{folder_path}{transcription_job_name}-{language}.{output_format}'
@@ -274,24 +492,40 @@ def get_transcription(transcription_job_name: str, s3_bucket: str, identity_id:
     -------
     - The function uses the `get_file_key` function to determine the key of the transcription file in S3.
     - It retrieves the file from S3 and parses it as JSON to extract the transcription text.
+    - The transcription text is cached with the ETag of the file. Later calls send the ETag in `IfNoneMatch`,
+      so S3 answers with 304 Not Modified without the file content and the cached text is returned.
     - If the expected data is not found in the JSON structure, a `ValueError` is raised.
     """
     transcription_file_key = get_file_key(transcription_job_name, constants.TRANSCRIPTIONS_FOLDER_PATH, identity_id)
+    with transcription_cache_lock:
+        cached = transcription_cache.get(transcription_file_key)
     
     try: 
-        json_content = get_json_from_s3(s3_bucket, transcription_file_key)
-        if json_content.get("results") and \
-            json_content["results"].get("transcripts") and \
-                json_content["results"]["transcripts"][0] and \
-                    json_content["results"]["transcripts"][0].get("transcript"):
-            return json_content["results"]["transcripts"][0]["transcript"]
+        if cached:
+            # Only download the file again if it changed since it was cached
+            response = s3.get_object(Bucket=s3_bucket, Key=transcription_file_key, IfNoneMatch=cached[0])
         else:
+            response = s3.get_object(Bucket=s3_bucket, Key=transcription_file_key)
+        json_content = json_loads(response['Body'].read())
+        try:
+            transcript = json_content["results"]["transcripts"][0]["transcript"]
+        except (KeyError, IndexError, TypeError):
+            transcript = None
+        if not transcript:
             raise ValueError("Transcription file is not as expected.")
+        with transcription_cache_lock:
+            transcription_cache[transcription_file_key] = (response['ETag'], transcript)
+        return transcript
+    except ClientError as e:
+        if cached and e.response['Error']['Code'] == '304':
+            return cached[1]
+        logger.debug("Error getting transcription content from S3: %s", e)
+        raise e
     except Exception as e:
-        logger.debug("Error getting transcription content from S3: %s", str(e))
+        logger.debug("Error getting transcription content from S3: %s", e)
         raise e
 
-def check_s3_file_exists(bucket_name: str, file_key: str) -> bool:
+def check_s3_file_exists(bucket_name: str, file_key: str, known_keys: set = None) -> bool:
     """
     Checks if a file exists in an S3 bucket by attempting to retrieve the file's metadata.
 
@@ -301,6 +535,9 @@ def check_s3_file_exists(bucket_name: str, file_key: str) -> bool:
         The name of the S3 bucket where the file is stored.
     file_key : str
         The key (path) of the file within the S3 bucket.
+    known_keys : set, optional
+        The keys listed with `list_keys_with_prefix` under the prefix of the file. If provided, the file
+        exists if its key is in the set and no request is made.
 
     Returns:
     --------
@@ -315,11 +552,58 @@ def check_s3_file_exists(bucket_name: str, file_key: str) -> bool:
             - `AccessDenied`: If access to the S3 bucket or object is denied.
             - `RequestLimitExceeded`: If request rate exceeds the allowed limit.
     """
+    if known_keys is not None:
+        return file_key in known_keys
     try:
         s3.head_object(Bucket=bucket_name, Key=file_key)
         return True  
-    except Exception as e:
-        logger.debug("Error getting file from S3: %s", str(e))
-        return False
-        
-        
\ No newline at end of file
+    except ClientError as e:
+        # A missing file is the expected result, only the other errors are logged and raised
+        if e.response['Error']['Code'] in MISSING_OBJECT_ERROR_CODES:
+            return False
+        logger.debug("Error getting file from S3: %s", e)
+        raise e
+
+def list_keys_with_prefix(bucket_name: str, prefix: str) -> set:
+    """
+    Lists the keys of the files under a prefix. Used to check if several files under the same prefix exist
+    with one `list_objects_v2` request per 1000 keys, instead of one `head_object` request per file.
+
+    Parameters:
+    -----------
+    bucket_name : str
+        The name of the S3 bucket where the files are stored.
+    prefix : str
+        The prefix shared by the keys of the files.
+
+    Returns:
+    --------
+    set
+        The keys of the files under the prefix.
+
+    Raises:
+    -------
+    botocore.exceptions.ClientError
+        For various client-related errors, such as:
+            - `NoSuchBucket`: If the specified S3 bucket does not exist.
+            - `AccessDenied`: If listing the S3 bucket is denied.
+    """
+    paginator = s3.get_paginator('list_objects_v2')
+    return {obj['Key'] for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix) for obj in page.get('Contents', [])}
+
+def cache_json(s3_bucket: str, file_key: str, json_content):
+    """
+    Keeps the content of a JSON file in memory for `JSON_CACHE_TTL` seconds, evicting the least recently used entry when the cache is full.
+    The content is shared by the later reads of the file and must not be modified.
+
+    Parameters:
+    -----------
+    s3_bucket : str
+        The name of the S3 bucket of the file.
+    file_key : str
+        The key (path) of the file within the S3 bucket.
+    json_content : any
+        The JSON content of the file.
+    """
+    with json_cache_lock:
+        json_cache[(s3_bucket, file_key)] = json_content
@@ -0,0 +1,114 @@
+"""
+text_generation_utils.py
+
+This module provides the request flow shared by the Lambda functions that generate a text from a
+transcription (summary and flashcards): it reads the request parameters and the user identity, reuses
+or generates the text, synthesizes its audio and builds the response.
+
+Imports:
+---------
+- os: Provides access to environment variables.
+- logging: Provides log levels and structured logging.
+- concurrent.futures.ThreadPoolExecutor: Used to fetch the transcription and to synthesize the speech of a new text concurrently.
+- constants: Defines constants used throughout the module (imported from Lambda layer).
+- parameter_utils: Custom utility functions for extracting parameters from the event (imported from Lambda layer).
+- response_utils: Custom utility functions for formatting and sending responses (imported from Lambda layer).
+- bedrock_utils: Custom utility functions for interacting with Bedrock AI models (imported from Lambda layer).
+- cognito_utils: Custom utility functions for handling AWS Cognito operations (imported from Lambda layer).
+- s3_utils: Custom utility functions for interacting with S3 (imported from Lambda layer).
+- s3_cache_utils: Custom utility functions for caching and retrieving responses from Amazon S3 (imported from Lambda layer).
+
+Environment Variables:
+----------------------
+- MEDIA_BUCKET: The name of the S3 bucket used for storing media files.
+- REGION: The AWS region where the resources are located.
+- IDENTITY_POOL_ID: The ID of the Cognito Identity Pool.
+- USER_POOL_ID: The ID of the Cognito User Pool.
+
+Functions:
+-----------
+- run_text_generation(event, folder_path, generator_fn, polly_text_fn)
+"""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import constants # from layer
+import parameter_utils # from layer
+import response_utils # from layer
+import bedrock_utils # from layer
+import cognito_utils # from layer
+import s3_utils # from layer
+import s3_cache_utils # from layer
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+MEDIA_BUCKET = os.environ[constants.MEDIA_BUCKET]
+REGION = os.environ[constants.REGION]
+IDENTITY_POOL_ID = os.environ[constants.IDENTITY_POOL_ID]
+USER_POOL_ID = os.environ[constants.USER_POOL_ID]
+executor = ThreadPoolExecutor(max_workers=4)
+
+def run_text_generation(event: dict, folder_path: str, generator_fn, polly_text_fn=None) -> dict:
+    """
+    Handles a request to generate a text from a transcription, shared by the summary and flashcards functions.
+
+    The text is read from S3 if it was already generated for the transcription, model and language, otherwise
+    it is generated with `generator_fn` and saved to S3. The audio of the text is synthesized with Amazon Polly,
+    a new text is synthesized while it is written to S3. The request does not fail if the speech synthesis fails.
+
+    Parameters:
+    -----------
+    event : dict
+        The input event containing parameters and data for processing.
+    folder_path : str
+        The S3 folder of the generated texts (e.g., constants.SUMMARIES_FOLDER_PATH).
+    generator_fn : callable
+        Generates the text, called as `generator_fn(transcription, language, model_id)`.
+    polly_text_fn : callable, optional
+        Converts the generated text into the text read by Amazon Polly, the generated text is read as is by default.
+
+    Returns:
+    --------
+    dict
+        The HTTP response with the status code, the generated text and its S3 key, and the audio key
+        or speech synthesis task ID when available.
+    """
+    try:
+        transcription_job_name = parameter_utils.get_path_parameter(event, constants.TRANSCRIPTION_JOB_NAME_PARAMETER)
+        language = parameter_utils.get_query_string_parameter(event, constants.LANGUAGE_PARAMETER)
+        model_id = bedrock_utils.get_model_id(event)
+        identity_id = cognito_utils.get_cognito_identity_id(REGION, IDENTITY_POOL_ID, USER_POOL_ID, cognito_utils.get_authorization_token(event))
+
+        # The transcription is fetched while the existing text is looked up in S3, it is only needed to generate a new text
+        transcription_fetch = executor.submit(s3_utils.get_transcription, transcription_job_name, MEDIA_BUCKET, identity_id)
+        file_key = s3_utils.get_file_key(transcription_job_name, folder_path, identity_id, model_id=model_id, language=language)
+        audio_key = s3_utils.get_file_key(transcription_job_name, f'{folder_path}{constants.AUDIOS_FOLDER_PATH}', identity_id, output_format=constants.MP3, model_id=model_id, language=language)
+        polly_text_fn = polly_text_fn or (lambda text: text)
+        speech_synthesis = []
+
+        def generate_text():
+            text = generator_fn(transcription_fetch.result(), language, model_id)
+            # Start the speech synthesis of a new text while it is written to S3
+            speech_synthesis.append(executor.submit(lambda: s3_cache_utils.get_or_synthesize_speech(MEDIA_BUCKET, audio_key, polly_text_fn(text), constants.MP3, language, async_processing=False)))
+            return text
+
+        text, repeated_requested = s3_cache_utils.get_or_generate_bedrock_response(MEDIA_BUCKET, file_key, generate_text)
+        transcription_fetch.cancel()
+        try:
+            if speech_synthesis:
+                synthesis_result = speech_synthesis[0].result()
+            else:
+                synthesis_result = s3_cache_utils.get_or_synthesize_speech(MEDIA_BUCKET, audio_key, polly_text_fn(text), constants.MP3, language, async_processing=repeated_requested)
+            if constants.SYNTHESIS_RESULT_TASK_ID in synthesis_result:
+                return response_utils.send_response_speech_synthesis(text, file_key, synthesis_result[constants.SYNTHESIS_RESULT_TASK_ID])
+            elif constants.SYNTHESIS_RESULT_AUDIO_KEY in synthesis_result:
+                return response_utils.send_response_with_file_key_and_audio_key(text, file_key, synthesis_result[constants.SYNTHESIS_RESULT_AUDIO_KEY])
+        except Exception as e:
+            logger.debug("Polly synthesis failed: %s", str(e)) # Log the exception in debug model but proceed without failing the entire function
+
+        return response_utils.send_response_with_file_key(text, file_key)
+
+    except Exception as e:
+        return response_utils.format_exception(e)
@@ -458,7 +458,8 @@ export class MainStack extends cdk.Stack {
           'X-Api-Key',
           'Access-Control-Allow-Credentials',
           'Access-Control-Allow-Headers',
-          'Impersonating-User-Sub'
+          'Impersonating-User-Sub',
+          'If-None-Match'
         ],
         allowMethods: ['OPTIONS', 'GET', 'POST', 'PUT', 'PATCH', 'DELETE'],
         allowCredentials: true,
@@ -675,6 +676,7 @@ export class MainStack extends cdk.Stack {
         }
       ],
       apiResource: transcriptionsWithNameResource,
+      additionalApiResources: [transcriptionsResource], // Batch requests with the transcriptionJobNames query string parameter
       method: GET,
       authorizer: apiAuthorizer,
       layers: [utilsLayer]
@@ -1079,6 +1081,7 @@ export class MainStack extends cdk.Stack {
         }
       ],
       apiResource: audiosWithTaskIdResource,
+      additionalApiResources: [audiosResource], // Batch requests with the taskIds query string parameter
       method: GET,
       authorizer: apiAuthorizer,
       layers: [utilsLayer]